@@ -1,66 +1,73 @@
-import asyncio
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 import os
-from app.core.config import settings
 from app.models.models import Language
+from app.utils.llm_cache import cached_call
 from app.utils.logger import setup_logger
-from openai import OpenAI # type: ignore
+from app.utils.model_routing import route_for
+from app.utils.token_budget import budget_for, trim_text
+from app.utils.tokens import count_message_tokens, count_tokens
+from app.services.openai import chat_completion
 
 
 logger = setup_logger("agent", "agent.log")
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-async def extractor(requested_keys, message: str) -> Dict:
-    max_retries = 3
-    retry_delay = 2  # seconds
+EXTRACTOR_SYSTEM = "You are a smart key-value pair extractor. Always return a JSON object with the requested keys."
 
-    for attempt in range(max_retries):
-        try:
-            prompt = f"Extract the following keys: {requested_keys} from this text: '{message}' and return them in JSON format. If a value is missing, set it to None."
+def _extractor_prompt(requested_keys, message: str) -> str:
+    return f"Extract the following keys: {requested_keys} from this text: '{message}' and return them in JSON format. If a value is missing, set it to None."
 
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
+async def extractor(requested_keys, message: str) -> Dict:
+    model = route_for("extractor").model
+    fixed = count_message_tokens([{"content": EXTRACTOR_SYSTEM}, {"content": _extractor_prompt(requested_keys, "")}], model)
+    message = trim_text(message, budget_for("extractor") - fixed, model)
+    prompt = _extractor_prompt(requested_keys, message)
+    return await cached_call("extractor", prompt, model, lambda: _extract(prompt, message))
+
+async def _extract(prompt: str, message: str) -> Tuple[Dict, int]:
+    # rate limits and transient API errors are retried by chat_completion;
+    # here only a reply that is not valid JSON is asked for again
+    max_attempts = 3
+    tokens = 0
+
+    for attempt in range(max_attempts):
+        try:
+            response = await chat_completion(
+                call_site="extractor",
                 messages=[
-                    {"role": "system", "content": "You are a smart key-value pair extractor. Always return a JSON object with the requested keys."},
+                    {"role": "system", "content": EXTRACTOR_SYSTEM},
                     {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
+                ]
             )
+        except Exception as e:
+            print(f"Extractor call failed: {str(e)}")
+            return {}, tokens
 
-            content = response.choices[0].message.content
+        content = response.choices[0].message.content
+        tokens += response.usage.total_tokens if response.usage else count_tokens(prompt, route_for("extractor").model)
 
-            if not content:
-                print("Content is empty")
-                return {}
+        if not content:
+            print("Content is empty")
+            return {}, tokens
 
-            if isinstance(content, dict):
-                return content
+        if isinstance(content, dict):
+            return content, tokens
 
-            if isinstance(content, str):
-                content = content.strip()
+        if isinstance(content, str):
+            content = content.strip()
 
+        try:
+            return json.loads(content), tokens
+        except json.JSONDecodeError:
             try:
-                return json.loads(content)
+                content = content.replace("'", '"')
+                return json.loads(content), tokens
             except json.JSONDecodeError:
-                try:
-                    content = content.replace("'", '"')
-                    return json.loads(content)
-                except json.JSONDecodeError:
-                    print(f"Failed to parse message {message} with type: {type(content)} as JSON")
-                    raise  # Re-raise to trigger retry
+                print(f"Attempt {attempt + 1}: failed to parse message {message} with type: {type(content)} as JSON")
 
-        except Exception as e:
-            if attempt < max_retries - 1:  # Don't sleep on the last attempt
-                print(f"Attempt {attempt + 1} failed. Retrying in {retry_delay} seconds...")
-                await asyncio.sleep(retry_delay)
-                retry_delay *= 2  # Double the delay for next retry
-            else:
-                print(f"All {max_retries} attempts failed. Final error: {str(e)}")
-                return {}
-
-    return {}
+    print(f"All {max_attempts} attempts returned invalid JSON")
+    return {}, tokens
 
 async def create_appointment_dialog_agent(message, conversation_history, appointment_details) -> Dict:
     dialogue_template = f"""
@@ -87,13 +94,12 @@ If switching from English to Spanish or vice versa, maintain consistent tone and
 """
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = await chat_completion(
+            call_site="create_appointment_dialog_agent",
             messages=[
                 {"role": "system", "content": dialogue_template},
                 {"role": "user", "content": message}
-            ],
-            temperature=0.3
+            ]
         )
 
         content = response.choices[0].message.content
@@ -125,13 +131,12 @@ Respond with only the intent label.
 """
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = await chat_completion(
+            call_site="intent_agent",
             messages=[
                 {"role": "system", "content": "You are an intent classification agent. Respond with just the intent."},
                 {"role": "user", "content": template}
-            ],
-            temperature=0.3
+            ]
         )
 
         content = response.choices[0].message.content
@@ -169,13 +174,12 @@ User intent: {user_intent}
 """
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = await chat_completion(
+            call_site="response_agent",
             messages=[
                 {"role": "system", "content": template},
                 {"role": "user", "content": message}
-            ],
-            temperature=0.3
+            ]
         )
 
         content = response.choices[0].message.content
@@ -199,13 +203,12 @@ async def translate_agent(text: str, source_language: Language, target_language:
     """
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = await chat_completion(
+            call_site="translate_agent",
             messages=[
                 # {"role": "system", "content": "You are a smart key-value pair extractor. Always return a JSON object with the requested keys."},
                 {"role": "user", "content": template}
-            ],
-            temperature=0.3
+            ]
         )
 
         content = response.choices[0].message.content
@@ -218,8 +221,8 @@ async def translate_agent(text: str, source_language: Language, target_language:
 
 async def generate_generic_response(message: str, conversation_history: list) -> str:
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = await chat_completion(
+            call_site="generate_generic_response",
             messages=[
                 {
                     "role": "system",
@@ -231,8 +234,7 @@ async def generate_generic_response(message: str, conversation_history: list) ->
                                f"Conversation History: {conversation_history}"
                 },
                 {"role": "user", "content": message}
-            ],
-            temperature=0.7
+            ]
         )
 
         return response.choices[0].message.content
@@ -247,13 +249,132 @@ async def generate_ai_response(prompt: str, history: list = None, system_msg: st
         messages.extend(history)
     messages.append({"role": "user", "content": prompt})
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            temperature=0.7
+        response = await chat_completion(
+            call_site="generate_ai_response",
+            messages=messages
         )
 
         return response.choices[0].message.content
     except Exception as e:
         logger.error(f"OpenAI error: {str(e)}")
-        return "Oops, something went wrong! Let's try again."
\ No newline at end of file
+        return "Oops, something went wrong! Let's try again."
+
+TURN_INTENTS = [
+    "create_appointment", "cancel_appointment", "edit_appointment", "check_appointment_status",
+    "language_english", "language_spanish", "greet", "other"
+]
+CONFIRMATION_INTENTS = ["CONFIRM", "CHANGE_REQUEST", "ABORT", "FETCH_ITEMS", "OTHER"]
+
+
+def _turn_analysis_schema(requested_keys: List[str]) -> Dict:
+    nullable_string = {"type": ["string", "null"]}
+    return {
+        "name": "turn_analysis",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "intent": {"type": "string", "enum": TURN_INTENTS},
+                "confirmation_intent": {"type": "string", "enum": CONFIRMATION_INTENTS},
+                "booking_code": nullable_string,
+                "entities": {
+                    "type": "object",
+                    "properties": {key: nullable_string for key in requested_keys},
+                    "required": list(requested_keys),
+                    "additionalProperties": False
+                }
+            },
+            "required": ["intent", "confirmation_intent", "booking_code", "entities"],
+            "additionalProperties": False
+        }
+    }
+
+
+def _turn_analysis_prompt(message: str, history: str, context: str) -> str:
+    return f"""
+Analyse the user's latest message in a WhatsApp conversation between a clinic and a medical appointment assistant.
+
+intent - the primary intent of the message:
+- create_appointment: User wants to book a new appointment
+- cancel_appointment: User wants to cancel an existing appointment
+- edit_appointment: User wants to change or update an existing appointment
+- check_appointment_status: User wants to check the status of an existing appointment
+- language_english: User indicates preference for English language
+- language_spanish: User indicates preference for Mexican Spanish language
+- greet: User is greeting the system
+- other: None of the above
+
+confirmation_intent - how the message answers the assistant's last question:
+- CONFIRM: User confirms the details or the change shown to them
+- CHANGE_REQUEST: User requests a change or provides new details (e.g., update date or name)
+- ABORT: User chooses to abort the operation
+- FETCH_ITEMS: User doesn't have a booking code handy and wants us to fetch their latest appointments
+- OTHER: The response is unclear or unrelated
+
+booking_code - the booking code in the message (codes look like IVX followed by 6 letters or digits), or null.
+
+entities - the value of each key found in the message, or null when it is not provided.
+
+Conversation state: {context or "none"}
+
+Conversation history:
+{history}
+
+User message: {message}
+"""
+
+
+async def analyze_turn(message: str, requested_keys: List[str], history: str = "", context: str = "") -> Optional[Dict]:
+    """Intent, confirmation intent, booking code and entities in one structured call.
+
+    Returns None when the call fails so callers can fall back to asking
+    each question separately.
+    """
+    # the oldest history goes first when the prompt would exceed the call site's budget
+    model = route_for("turn_analysis").model
+    fixed = count_tokens(_turn_analysis_prompt(message, "", context), model)
+    history = trim_text(history, budget_for("turn_analysis") - fixed, model, keep_end=True)
+    template = _turn_analysis_prompt(message, history, context)
+
+    try:
+        response = await chat_completion(
+            call_site="turn_analysis",
+            messages=[
+                {"role": "system", "content": "You analyse user messages and return the requested JSON object."},
+                {"role": "user", "content": template}
+            ],
+            response_format={"type": "json_schema", "json_schema": _turn_analysis_schema(requested_keys)}
+        )
+        return json.loads(response.choices[0].message.content)
+    except Exception as e:
+        logger.error(f"Turn analysis failed: {str(e)}")
+        return None
+
+async def summarize_history(summary: str, transcript: str) -> Optional[str]:
+    """Fold older conversation lines into the running summary; None when the call fails"""
+    template = f"""
+Update the running summary of a WhatsApp conversation between a clinic and a medical appointment assistant.
+
+Keep every fact still needed to continue the conversation: names, clinic, patient details, procedure,
+dates, times, booking codes, the language in use and what the assistant is waiting for. Drop greetings
+and small talk. Write at most {route_for("history_summary").max_tokens} tokens of plain text.
+
+Current summary:
+{summary or "none"}
+
+Older messages to fold in:
+{transcript}
+"""
+
+    try:
+        response = await chat_completion(
+            call_site="history_summary",
+            messages=[
+                {"role": "system", "content": "You maintain concise, factual conversation summaries."},
+                {"role": "user", "content": template}
+            ]
+        )
+        return (response.choices[0].message.content or "").strip() or None
+    except Exception as e:
+        logger.error(f"History summary failed: {str(e)}")
+        return None
@@ -2,12 +2,10 @@ from typing import Dict
 from app.models.models import ConversationState, Message
 from typing import Dict
 from app.core.config import settings
-from openai import OpenAI # type: ignore
 # import whisper # type: ignore
 import os
 
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 WHATSAPP_API_KEY = os.getenv("WHATSAPP_API_KEY")
 
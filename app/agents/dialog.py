@@ -5,10 +5,9 @@ import os
 from app.core.config import settings
 from app.models.models import ConversationState, Intent
 from app.utils import helpers
-from openai import OpenAI # type: ignore
+from app.services.openai import chat_completion
 
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 class DialogAgent(BaseAgent):
@@ -70,13 +69,12 @@ class DialogAgent(BaseAgent):
 
     async def _generate_prompt_for_missing_fields(self, state: ConversationState) -> str:
         prompt = f"Generate a friendly message asking for: {', '.join(state.missing_fields)}"
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = await chat_completion(
+            call_site="dialog_missing_fields",
             messages=[
                 {"role": "system", "content": "You are a friendly medical assistant"},
                 {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
+            ]
         )
         return response.choices[0].message.content
         # missing_fields = state.missing_fields
@@ -118,9 +116,9 @@ Reply with:
         return summary_message
 
 
-    def generate_generic_response(self, message: str) -> str:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+    async def generate_generic_response(self, message: str) -> str:
+        response = await chat_completion(
+            call_site="dialog_generic_response",
             messages=[
                 {
                     "role": "system",
@@ -131,8 +129,7 @@ Reply with:
                     )
                 },
                 {"role": "user", "content": message}
-            ],
-            temperature=0.7
+            ]
         )
 
         return response.choices[0].message.content
\ No newline at end of file
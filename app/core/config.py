@@ -1,3 +1,4 @@
+from typing import Any, Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -8,11 +9,186 @@ class Settings(BaseSettings):
     GRAPH_API_TOKEN: str
     WEBHOOK_VERIFY_TOKEN: str
     WHATSAPP_BUSINESS_ACCOUNT_ID: str
+    # sent as X-Admin-Token to the admin endpoints (cache invalidation); None disables them
+    ADMIN_API_TOKEN: Optional[str] = None
+    GRAPH_API_URL: str = "https://graph.facebook.com/v18.0"
 
     BUBBLE_API_KEY: str
     BUBBLE_API_URL: str
     OPENAI_API_KEY: str
 
+    # Inbound message dispatcher
+    DISPATCHER_WORKERS: int = 8
+    # consecutive texts from one phone within this window run as one turn (0 disables)
+    COALESCE_WINDOW_MS: int = 1200
+    COALESCE_MAX_WAIT_MS: int = 5000
+
+    # Conversation state persistence: "json" (one file per manager) or "sqlite"
+    STATE_BACKEND: str = "json"
+    STATE_DB_PATH: str = "states.db"
+    # json backend flush interval (0 writes through on every update)
+    STATE_FLUSH_INTERVAL_MS: int = 200
+    # idle or least recently used conversations are evicted from memory and
+    # archived to STATE_ARCHIVE_PATH (json backend), then rehydrated on demand
+    STATE_IDLE_TTL_SECONDS: int = 604800
+    STATE_MAX_RESIDENT: int = 10000
+    STATE_ARCHIVE_PATH: str = "state_archive.db"
+
+    # Chat history fed to invoke_ai: the last HISTORY_WINDOW messages per phone,
+    # written through to HISTORY_DB_PATH (None keeps it in memory only)
+    HISTORY_WINDOW: int = 5
+    HISTORY_DB_PATH: Optional[str] = "history.db"
+    HISTORY_IDLE_TTL_SECONDS: int = 86400
+    HISTORY_MAX_RESIDENT: int = 10000
+    # messages beyond the window or the token budget are folded into a rolling summary
+    # by a background call (the "history_summary" route); disabled, they are simply dropped
+    HISTORY_TOKEN_BUDGET: int = 800
+    HISTORY_SUMMARY_ENABLED: bool = True
+
+    # Inbound de-duplication of webhook retries
+    DEDUP_TTL_SECONDS: int = 86400
+    DEDUP_MAX_ENTRIES: int = 100000
+    DEDUP_DB_PATH: Optional[str] = None
+
+    # Shared outbound client for the Graph API
+    WHATSAPP_HTTP2: bool = True
+    WHATSAPP_MAX_CONNECTIONS: int = 50
+    WHATSAPP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    WHATSAPP_KEEPALIVE_EXPIRY: float = 60.0
+    WHATSAPP_TIMEOUT: float = 30.0
+    WHATSAPP_CONNECT_TIMEOUT: float = 5.0
+
+    # Shared outbound client for the Bubble data API
+    BUBBLE_HTTP2: bool = False
+    BUBBLE_MAX_CONNECTIONS: int = 50
+    BUBBLE_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    BUBBLE_KEEPALIVE_EXPIRY: float = 60.0
+    BUBBLE_TIMEOUT: float = 30.0
+    BUBBLE_CONNECT_TIMEOUT: float = 5.0
+
+    # Shared AsyncOpenAI client
+    OPENAI_BASE_URL: Optional[str] = None
+    OPENAI_TIMEOUT: float = 60.0
+
+    # Client-side OpenAI limiter: requests and tokens per minute (0 disables either bucket).
+    # Concurrency starts at OPENAI_MAX_CONCURRENCY, halves on every 429 (down to
+    # OPENAI_MIN_CONCURRENCY) and grows back while calls succeed. 429s, 5xx and connection
+    # errors are retried OPENAI_MAX_RETRIES times, after retry-after or an exponential backoff.
+    OPENAI_RPM_LIMIT: int = 3500
+    OPENAI_TPM_LIMIT: int = 90000
+    OPENAI_MAX_CONCURRENCY: int = 16
+    OPENAI_MIN_CONCURRENCY: int = 1
+    OPENAI_MAX_RETRIES: int = 2
+    OPENAI_BACKOFF_SECONDS: float = 1.0
+    # Queue priority per LLM call site when the limiter is saturated; lower goes first
+    LLM_DEFAULT_PRIORITY: int = 5
+    LLM_PRIORITIES: Dict[str, int] = {
+        "doctor_intent": 0,
+        "doctor_reply": 0,
+        "history_summary": 9,
+    }
+
+    # Deadline per LLM call site, covering queueing, retries and hedges. Listed call sites
+    # (idempotent and short) are hedged: a duplicate request goes out once the first has
+    # run past the LLM_HEDGE_PERCENTILE of recent attempts, at most LLM_HEDGE_MAX_RATIO of
+    # a call site's calls (LLM_HEDGE_BURST in a row). A call that misses its deadline
+    # gets one attempt on LLM_FALLBACK_MODEL, at LLM_FALLBACK_BASE_URL when another
+    # OpenAI-compatible provider is wanted (None disables the fallback).
+    LLM_DEFAULT_DEADLINE_SECONDS: float = 20.0
+    LLM_DEADLINES: Dict[str, float] = {
+        "classify_intent": 8.0,
+        "doctor_intent": 8.0,
+        "extractor": 8.0,
+        "turn_analysis": 10.0,
+        "history_summary": 30.0,
+    }
+    LLM_HEDGE_CALL_SITES: List[str] = ["classify_intent", "doctor_intent", "extractor", "turn_analysis"]
+    LLM_HEDGE_PERCENTILE: float = 90.0
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_MAX_RATIO: float = 0.1
+    LLM_HEDGE_BURST: float = 10.0
+    LLM_FALLBACK_MODEL: Optional[str] = "gpt-4o-mini"
+    LLM_FALLBACK_BASE_URL: Optional[str] = None
+    LLM_FALLBACK_API_KEY: Optional[str] = None
+    LLM_FALLBACK_DEADLINE_SECONDS: float = 10.0
+
+    # Model routing: the tier, temperature and max_tokens each LLM call site runs with
+    # (LLM_DEFAULT_ROUTE for unlisted ones). Compare candidates on logged turns with
+    # scripts/eval_model_routing.py before moving a call site to another tier.
+    LLM_MODEL_TIERS: Dict[str, str] = {
+        "small": "gpt-4o-mini",
+        "standard": "gpt-3.5-turbo",
+        "large": "gpt-4o",
+    }
+    LLM_DEFAULT_ROUTE: Dict[str, Any] = {"tier": "standard", "temperature": 0.7}
+    LLM_ROUTES: Dict[str, Dict[str, Any]] = {
+        # one-token labels
+        "classify_intent": {"tier": "small", "temperature": 0, "max_tokens": 10},
+        "confirmation_intent": {"tier": "small", "temperature": 0, "max_tokens": 10},
+        "doctor_intent": {"tier": "small", "temperature": 0, "max_tokens": 10},
+        "intent_agent": {"tier": "small", "temperature": 0, "max_tokens": 10},
+        # structured output
+        "extractor": {"tier": "small", "temperature": 0, "max_tokens": 300},
+        "turn_analysis": {"tier": "small", "temperature": 0, "max_tokens": 300},
+        "history_summary": {"tier": "small", "temperature": 0, "max_tokens": 200},
+        # customer-facing prose
+        "request_confirmation": {"tier": "standard", "temperature": 0.5, "max_tokens": 400},
+        "greeting": {"tier": "standard", "temperature": 0.7, "max_tokens": 200},
+        "create_appointment_dialog_agent": {"tier": "standard", "temperature": 0.3},
+        "response_agent": {"tier": "standard", "temperature": 0.3},
+        "translate_agent": {"tier": "standard", "temperature": 0.3},
+        "crew_agent": {"tier": "standard", "temperature": 0.5},
+        # the model and temperature these had hardcoded before routing (gpt-3.5-turbo at 0.7),
+        # pinned so a change to LLM_DEFAULT_ROUTE does not move them
+        "reply": {"tier": "standard", "temperature": 0.7},
+        "doctor_reply": {"tier": "standard", "temperature": 0.7},
+        "agent_completion": {"tier": "standard", "temperature": 0.7},
+        "generate_generic_response": {"tier": "standard", "temperature": 0.7},
+        "generate_ai_response": {"tier": "standard", "temperature": 0.7},
+        "dialog_missing_fields": {"tier": "standard", "temperature": 0.7},
+        "dialog_generic_response": {"tier": "standard", "temperature": 0.7},
+    }
+
+    # One structured call per clinic turn for intent + entities
+    # (its "turn_analysis" route needs a model with json_schema support)
+    TURN_ANALYSIS_ENABLED: bool = True
+
+    # Local intent classifier (scripts/train_intent_model.py); below the threshold the LLM decides
+    INTENT_MODEL_DIR: str = "models"
+    INTENT_CONFIDENCE_THRESHOLD: float = 0.85
+    # LLM-labelled (message, intent) pairs for training, opt-in: the messages are raw clinic
+    # text with patient details. Rotated to <path>.1 once past INTENT_LOG_MAX_BYTES.
+    INTENT_LOG_PATH: Optional[str] = None
+    INTENT_LOG_MAX_BYTES: int = 20 * 1024 * 1024
+
+    # Read-through cache for Bubble lookups: "memory" or "redis"
+    CACHE_BACKEND: str = "memory"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_MAX_ENTRIES: int = 10000
+    DOCTOR_CACHE_TTL_SECONDS: int = 3600
+    # non-doctors are the common case; keep them shorter so a new doctor is recognised soon
+    NOT_DOCTOR_CACHE_TTL_SECONDS: int = 300
+
+    # LLM response cache; each call site shares responses "global"ly, per "language" or per "phone".
+    # Call sites missing here (e.g. replies that depend on the conversation) are never cached.
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    LLM_CACHE_MAX_ENTRIES: int = 5000
+    LLM_CACHE_SCOPES: Dict[str, str] = {
+        "extractor": "global",
+        "doctor_intent": "global",
+    }
+
+    # Prompt token budget per LLM call site (the completion is not counted);
+    # chat history and optional context are trimmed to fit, overruns are counted
+    LLM_DEFAULT_TOKEN_BUDGET: int = 3000
+    LLM_TOKEN_BUDGETS: Dict[str, int] = {
+        "classify_intent": 1200,
+        "extractor": 600,
+        "request_confirmation": 1500,
+        "turn_analysis": 2500,
+    }
+
     class Config:
         env_file = ".env"
 
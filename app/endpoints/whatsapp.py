@@ -1,11 +1,15 @@
 
-from fastapi import APIRouter, BackgroundTasks, Request, HTTPException
-from app.models.models import Message
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Header, Request, HTTPException
 from app.services.doctor_service import DoctorService
-from app.utils.state_manager import StateManager
-from app.engine import AppointmentOrchestrator
+from app.engine import dispatcher
+from app.services.bubble_client import bubble_client
 from app.core.config import settings
-from datetime import datetime
+from app.utils.dedup import seen_messages
+from app.services.http_client import bubble_http, whatsapp_http
+from app.utils.metrics import metrics
+from app.utils.webhook import parse_webhook
 import traceback
 from app.utils.logger import setup_logger
 
@@ -14,67 +18,19 @@ router = APIRouter()
 
 
 @router.post("/webhook")
-async def handle_webhook(request: Request, background_tasks: BackgroundTasks):
+async def handle_webhook(request: Request):
     body = await request.json()
 
     try:
-        entry = body.get("entry", [{}])[0]
-        changes = entry.get("changes", [{}])[0]
-        value = changes.get("value", {})
-        messages = value.get("messages", [{}])[0]
-        message_text = messages.get("text", {}).get("body")
-        message_id = messages.get("id")
-        from_number = messages.get("from")
-        message_type = messages.get("type")
-
-        business_phone_number_id = value.get("metadata", {}).get("phone_number_id")
-        # print(business_phone_number_id, 'business_phone_number_id')
-        if not message_type:
-            return
-
-        if message_type == "text":
-            message_text = messages.get("text", {}).get("body")
-        elif message_type == "button":
-            message_text = messages.get("button", {}).get("text") #changed to .get("text")
-        elif message_type == "location":
-            location = messages.get("location", {})
-            latitude = location.get("latitude")
-            longitude = location.get("longitude")
-            address = location.get("address")
-            name = location.get("name")
-            if latitude and longitude:
-                # message_text = f"{latitude}, {longitude}"
-                message_text = address
-            else:
-                message_text = "Location data missing."
-        elif message_type == "audio":
-            message_text = messages.get("audio", {}).get("id") #changed to .get("id")
-        elif message_type == "interactive":
-            interactive = messages.get("interactive", {})
-            message_text = interactive.get("list_reply", {}).get("id") or interactive.get("button_reply", {}).get("id")
-        else:
-            # message_text = messages.get("text", {}).get("body")
-            logger.warning(f"Unhandled message type: {message_type}")
-
-        if not messages or not message_text or not message_type:
-            return
-
-        state = StateManager().get_state(from_number)
-
-        if state.get('is_processing') == True:
-            return {"status": "ok"}
+        messages, statuses = parse_webhook(body)
 
-        message = Message(
-            message_id=message_id,
-            phone_number=from_number,
-            type=message_type,
-            content=message_text,
-            timestamp=datetime.now(),
-            business_phone_number_id=business_phone_number_id
-        )
+        for message in messages:
+            if seen_messages.seen(message.message_id):
+                continue
+            dispatcher.submit(message)
 
-        # await orchestrator.process_message(message)
-        background_tasks.add_task(_process_message_task, message)
+        metrics.incr("webhook.messages", len(messages))
+        metrics.incr("webhook.statuses", len(statuses))
 
         return {"status": "ok"}
     except Exception as e:
@@ -131,9 +87,27 @@ async def appointment_reminder(request: Request):
         logger.error(f"Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def _process_message_task(message):
-    try:
-        await AppointmentOrchestrator(message).process_message()
-    except Exception as e:
-        logger.error(f"Error in background task processing message {message.message_id}: {e}")
-        traceback.print_exc()
+def require_admin(token: Optional[str]):
+    if not settings.ADMIN_API_TOKEN or not token or not hmac.compare_digest(token, settings.ADMIN_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@router.post("/cache/doctors/invalidate")
+async def invalidate_doctor_cache(request: Request, x_admin_token: Optional[str] = Header(None)):
+    """Called when the doctor directory changes; phone_number limits it to one entry"""
+    require_admin(x_admin_token)
+
+    phone_number = request.query_params.get("phone_number")
+    if phone_number:
+        await bubble_client.invalidate_doctor(phone_number)
+    else:
+        await bubble_client.invalidate_doctors()
+    return {"status": "ok", "invalidated": phone_number or "all"}
+
+@router.get("/metrics")
+async def get_metrics():
+    return {
+        "dispatcher": dispatcher.stats(),
+        "dedup": seen_messages.stats(),
+        "http": {"whatsapp": whatsapp_http.stats(), "bubble": bubble_http.stats()},
+        **metrics.snapshot()
+    }
@@ -6,7 +6,11 @@ from app.services.bubble_client import bubble_client
 from app.services.doctor_assitant import DoctorAssistant
 from app.services.langgraph import ClinicAssistant
 from app.services.whatsapp import WhatsAppBusinessAPI
+from app.core.config import settings
+from app.utils.dispatcher import MessageDispatcher
+from app.utils.doctor_state_manager import DoctorStateManager
 from app.utils.logger import setup_logger
+from app.utils.metrics import track_turn
 from app.utils.state_manager import StateManager
 
 logger = setup_logger("engine", "engine.log")
@@ -41,5 +45,19 @@ class AppointmentOrchestrator:
             traceback.print_exc()
 
             await self.whatsapp_service.send_text_message("I apologize, but I'm having trouble processing your request. Please try again in a moment.")
-        finally:
-            self.state_manager.update_state(self.message.phone_number, {"is_processing":False})
\ No newline at end of file
+
+
+async def process_inbound_message(message: Message):
+    phone = message.phone_number
+    # hold both state locks for the whole turn; always clinic before doctor
+    async with StateManager().lock(phone), DoctorStateManager().lock(phone):
+        with track_turn():
+            await AppointmentOrchestrator(message).process_message()
+
+
+dispatcher = MessageDispatcher(
+    handler=process_inbound_message,
+    workers=settings.DISPATCHER_WORKERS,
+    coalesce_window=settings.COALESCE_WINDOW_MS / 1000,
+    coalesce_max_wait=settings.COALESCE_MAX_WAIT_MS / 1000
+)
@@ -1,3 +1,4 @@
+from app.messages.templates import language_of, render
 from app.models.models import Message
 from app.services.bubble_client import bubble_client
 from app.utils import helpers
@@ -14,7 +15,7 @@ class BaseAppointmentHandler:
         self.user_input = self.message.content
         self.intent = intent
 
-        self.collector = DataCollector(self.clinic_phone, self.user_input)
+        self.collector = DataCollector(self.clinic_phone, self.user_input, analysis=self.message.analysis)
         self.required_fields = ["service_type", "patient_gender", "location", "patient_name", "patient_age_range", "date", "time"]
         self.optional_fields = ["additional_note"]
 
@@ -43,8 +44,7 @@ class BaseAppointmentHandler:
         return self._update_state_expect_resp()
 
     async def _request_booking_code(self):
-        prompt = f"Politely ask the user to provide a valid booking code for the appointment they want to {self.handler_name} or confirm if they prefer we fetch some of their latest appointments. Be conversational and friendly."
-        response = await invoke_ai(prompt, self.clinic_phone)
+        response = render(f"ask_booking_code.{self.handler_name}", language_of(self.state))
         await self._send_response(self.clinic_phone, response)
 
     async def _fetch_appointment(self):
@@ -53,14 +53,12 @@ class BaseAppointmentHandler:
         try:
             appointment = await bubble_client.find_appointment_by_code(booking_code)
         except Exception as e:
-            prompt = "Politely inform user we can't find an appointment with the provided booking code and suggest they try again."
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_not_found", language_of(self.state))
             await self._send_response(self.clinic_phone, response)
             return False
 
         if not appointment:
-            prompt = "Politely inform user we can't find an appointment with the provided booking code and suggest they try again."
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_not_found", language_of(self.state))
             await self._send_response(self.clinic_phone, response)
 
         print(appointment, 'appointment')
@@ -72,8 +70,7 @@ class BaseAppointmentHandler:
             appointments = await bubble_client.find_latest_appointments(self.clinic_phone)
 
             if not appointments:
-                prompt = self._get_no_appointments_prompt()
-                response = await invoke_ai(prompt, self.clinic_phone)
+                response = self._get_no_appointments_message()
                 return await self._send_response(self.clinic_phone, response)
 
             result = f"Your Upcoming Appointments:\n\nPlease copy the *Booking Code* of the appointment you'd like to {self.handler_name} and paste it in your response. 😊\n\n"
@@ -90,12 +87,11 @@ class BaseAppointmentHandler:
             return await self._send_response(self.clinic_phone, result)
         except Exception as e:
             print(f"Error fetching latest appointments {str(e)}")
-            prompt = "User is trying to access their appointment details, but we encountered a technical issue while retrieving the information. Politely apologize for the inconvenience, explain that we're experiencing a temporary problem with our booking system, and ask them to try again in a few minutes or contact the clinic directly."
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_fetch_error", language_of(self.state))
             return await self._send_response(self.clinic_phone, response)
 
-    def _get_no_appointments_prompt(self):
-        return "User has requested to find their appointment, but no appointments were found in our system. Politely inform them that we couldn't locate any appointments with their phone number and suggest they verify their information or book a new appointment."
+    def _get_no_appointments_message(self):
+        return render("no_appointments", language_of(self.state))
 
     async def _request_appointment_fetch(self):
         prompt =f"""
@@ -109,7 +105,7 @@ User input: "{self.user_input}"
 
 Respond with only the intent label.
 """
-        intent = await invoke_ai(prompt, self.clinic_phone)
+        intent = self.collector.confirmation_intent(["FETCH_ITEMS"]) or await invoke_ai(prompt, self.clinic_phone, call_site="confirmation_intent")
         print(intent, '_request_appointment_fetch intent')
 
         if intent == 'FETCH_ITEMS':
@@ -121,8 +117,7 @@ Respond with only the intent label.
         try:
             appointment = await self._fetch_appointment()
         except Exception as e:
-            prompt = "Politely inform user we can't find an appointment with the provided booking code and suggest they try again."
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_not_found", language_of(self.state))
             return await self._send_response(self.clinic_phone, response)
         self._update_state_expect_resp(**{"appointment": appointment, "booking_code": booking_code})
 
@@ -139,11 +134,10 @@ Respond with only the intent label.
 
     async def _handle_appointment_change(self, appointment):
         intent_prompt = self._get_confirmation_intent_prompt()
-        intent = await invoke_ai(intent_prompt, self.clinic_phone)
+        intent = self.collector.confirmation_intent(self.confirmation_intents) or await invoke_ai(intent_prompt, self.clinic_phone, call_site="confirmation_intent")
         print(intent, self.user_input, '_handle_appointment_change confirm intent')
 
         if intent in self.confirmation_intents:
-            self.state["confirmation_status"] = "CONFIRMED"
             self._update_state_simple(**{"confirmation_status":"CONFIRMED", "needs_clarification":False})
             return await self._save_data(appointment)
 
@@ -210,8 +204,7 @@ Aquí tienes el resumen de la cita:
             data = self._prepare_data_for_save(appointment)
             await bubble_client.update_appointment(id=appointment.get("_id"), data=data)
 
-            prompt = self._get_success_prompt()
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = self._get_success_message()
             await self._send_response(self.clinic_phone, response)
             self._update_state_simple(**{"appointment":None, "confirmation_status":None})
         except Exception as e:
@@ -231,10 +224,8 @@ Aquí tienes el resumen de la cita:
 
         return data
 
-    def _get_success_prompt(self):
-        return f"""
-        Inform the user that their booking has been successfully updated. Ask if there's anything else they need help with.
-        """
+    def _get_success_message(self):
+        return render("booking_updated", language_of(self.state))
 
     async def _extract_entities(self):
         all_fields = self.required_fields + self.optional_fields
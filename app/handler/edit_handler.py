@@ -1,4 +1,5 @@
 from datetime import datetime
+from app.messages.templates import language_of, render
 from app.models.models import Message
 from app.services.bubble_client import bubble_client
 from app.utils import helpers
@@ -15,7 +16,7 @@ class EditHandler:
         self.user_input = self.message.content
         self.intent = intent
 
-        self.collector = DataCollector(self.clinic_phone, self.user_input)
+        self.collector = DataCollector(self.clinic_phone, self.user_input, analysis=self.message.analysis)
         self.required_fields = ["service_type", "patient_gender", "location", "patient_name", "patient_age_range", "date", "time"]
         self.optional_fields = ["additional_note"]
 
@@ -41,8 +42,7 @@ class EditHandler:
         return self._update_state_expect_resp()
 
     async def _request_booking_code(self):
-        prompt = "Politely ask the user to provide a valid booking code for the appointment they want to edit or confirm if they prefer we fetch some of their latest appointments. Be conversational and friendly."
-        response = await invoke_ai(prompt, self.clinic_phone)
+        response = render("ask_booking_code.edit", language_of(self.state))
         await self._send_response(self.clinic_phone, response)
 
     async def _fetch_appointment(self):
@@ -51,14 +51,12 @@ class EditHandler:
         try:
             appointment = await bubble_client.find_appointment_by_code(booking_code)
         except Exception as e:
-            prompt = "Politely inform user we can't find an appointment with the provided booking code and suggest they try again."
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_not_found", language_of(self.state))
             await self._send_response(self.clinic_phone, response)
             return False
 
         if not appointment:
-            prompt = "Politely inform user we can't find an appointment with the provided booking code and suggest they try again."
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_not_found", language_of(self.state))
             await self._send_response(self.clinic_phone, response)
 
         print(appointment, 'appointment')
@@ -71,8 +69,7 @@ class EditHandler:
             appointments = await bubble_client.find_latest_appointments(self.clinic_phone)
 
             if not appointments:
-                prompt = "User has requested to find their appointment, but no appointments were found in our system. Politely inform them that we couldn't locate any appointments with their phone number and suggest they verify their information or book a new appointment."
-                response = await invoke_ai(prompt, self.clinic_phone)
+                response = render("no_appointments", language_of(self.state))
                 return await self._send_response(self.clinic_phone, response)
 
             result = "Your Upcoming Appointments:\n\nPlease copy the *Booking Code* of the appointment you'd like to edit and paste it in your response. 😊\n\n"
@@ -89,8 +86,7 @@ class EditHandler:
             return await self._send_response(self.clinic_phone, result)
         except Exception as e:
             print(f"Error fetching latest appointments {str(e)}")
-            prompt = "User is trying to access their appointment details, but we encountered a technical issue while retrieving the information. Politely apologize for the inconvenience, explain that we're experiencing a temporary problem with our booking system, and ask them to try again in a few minutes or contact the clinic directly."
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_fetch_error", language_of(self.state))
             return await self._send_response(self.clinic_phone, response)
 
 
@@ -106,7 +102,7 @@ User input: "{self.user_input}"
 
 Respond with only the intent label.
 """
-        intent = await invoke_ai(prompt, self.clinic_phone)
+        intent = self.collector.confirmation_intent(["FETCH_ITEMS"]) or await invoke_ai(prompt, self.clinic_phone, call_site="confirmation_intent")
         print(intent, '_request_appointment_fetch intent')
 
         if intent == 'FETCH_ITEMS':
@@ -118,8 +114,7 @@ Respond with only the intent label.
         try:
             appointment = await self._fetch_appointment()
         except Exception as e:
-            prompt = "Politely inform user we can't find an appointment with the provided booking code and suggest they try again."
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_not_found", language_of(self.state))
             return await self._send_response(self.clinic_phone, response)
         self._update_state_expect_resp(**{"appointment": appointment, "booking_code": booking_code})
 
@@ -148,11 +143,10 @@ User input: "{self.user_input}"
 
 Respond with only the intent label.
 """
-        intent = await invoke_ai(prompt, self.clinic_phone)
+        intent = self.collector.confirmation_intent(["CONFIRM", "CHANGE_REQUEST"]) or await invoke_ai(prompt, self.clinic_phone, call_site="confirmation_intent")
         print(intent, self.user_input, '_handle_appointment_change confirm intent')
 
         if intent == 'CONFIRM':
-            self.state["confirmation_status"] = "CONFIRMED"
             self._update_state_simple(**{"confirmation_status":"CONFIRMED", "needs_clarification":False})
             return await self._save_data(appointment)
 
@@ -215,10 +209,7 @@ Aquí tienes el resumen de la cita:
             # data['Modified Date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
             await bubble_client.update_appointment(id=appointment.get("_id"), data=data)
-            prompt = f"""
-            Inform the user that their booking has been successfully updated. Ask if there's anything else they need help with.
-            """
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_updated", language_of(self.state))
             await self._send_response(self.clinic_phone, response)
             return self._update_state_simple(**{"appointment":None, "confirmation_status":None, "needs_clarification": False, "intent": None})
         except Exception as e:
@@ -19,7 +19,7 @@ class GreetingHandler:
         self.user_input = self.state.get("user_input", "")
         self.full_name = self.state.get("full_name", "")
         self.clinic_name = self.state.get("clinic_name", "")
-        self.collector = DataCollector(self.clinic_phone, self.user_input)
+        self.collector = DataCollector(self.clinic_phone, self.user_input, analysis=self.message.analysis)
         self.required_fields = ["full_name", "clinic_name"]
 
     async def process(self) -> ClinicState:
@@ -116,13 +116,13 @@ class GreetingHandler:
         field_display_name = missing_field.replace('_', ' ')
 
         prompt = f"Respond warmly to this user message - {self.user_input} - as IVX AI Assistant, an assistant that helps clinics connect with doctors. If appropriate, acknowledge the user's message first. Then, ask for their {field_display_name} in a friendly, conversational way."
-        response = await invoke_ai(prompt, self.clinic_phone)
+        response = await invoke_ai(prompt, self.clinic_phone, call_site="greeting")
         await send_response(self.clinic_phone, response,  message=self.message)
 
     async def _send_greeting(self) -> None:
         """Send greeting message with collected information"""
         prompt = f"Respond warmly to the user's message: '{self.user_input}'. If appropriate, greet them using their name ({self.full_name}) and acknowledge the clinic they represent ({self.clinic_name}). Then, guide the conversation by asking how you can assist them today. Offer options such as booking, canceling, or checking appointments."
-        response = await invoke_ai(prompt, self.clinic_phone)
+        response = await invoke_ai(prompt, self.clinic_phone, call_site="greeting")
         await send_response(clinic_phone=self.clinic_phone, response_message=response, message=self.message)
 
     async def general_response(self) -> None:
@@ -7,6 +7,10 @@ from app.utils import helpers
 from app.utils.collect_data import DataCollector
 from app.utils.helpers import invoke_ai, send_response
 from app.utils.state_manager import StateManager
+from app.utils.token_budget import trim_text
+
+# free-text notes are quoted back in the confirmation prompt; cap what they add to it
+NOTE_MAX_TOKENS = 200
 
 
 class ProcedureCollector:
@@ -19,7 +23,7 @@ class ProcedureCollector:
         self.full_name = self.state.get("full_name", "")
         self.clinic_name = self.state.get("clinic_name", "")
 
-        self.collector = DataCollector(self.clinic_phone, self.user_input)
+        self.collector = DataCollector(self.clinic_phone, self.user_input, analysis=self.message.analysis)
         self.required_fields = ["service_type", "patient_gender", "location", "patient_name", "patient_age_range", "date", "time"]
         self.optional_fields = ["additional_note"]
 
@@ -121,14 +125,14 @@ Here is the appointment summary:
 - 📍 Appointment Location: {self.state.get("location")}
 - 📝 Patient Age: {self.state.get("patient_age_range")}
 - ⚧️ Patient Gender: {self.state.get("patient_gender")}
-- 📝 Additional Note: {self.state.get("additional_note")}
+- 📝 Additional Note: {trim_text(self.state.get("additional_note"), NOTE_MAX_TOKENS)}
 
 Could you kindly confirm if everything looks good or let me know what you'd like to update? 😊
 """
 
         prompt = f"Show the user a summary of the procedure details they provided: {procedure_summary}. Ask them to confirm if everything is correct, or specify what they'd like to change. Be conversational and friendly."
 
-        response = await invoke_ai(prompt, self.clinic_phone)
+        response = await invoke_ai(prompt, self.clinic_phone, call_site="request_confirmation")
         await self._send_response(self.clinic_phone, response)
 
     async def _handle_confirmation_response(self):
@@ -145,11 +149,10 @@ User input: "{self.user_input}"
 Respond with only the intent label.
 """
 
-        intent = await invoke_ai(prompt, self.clinic_phone)
+        intent = self.collector.confirmation_intent(["CONFIRM", "CHANGE_REQUEST"]) or await invoke_ai(prompt, self.clinic_phone, call_site="confirmation_intent")
         print(intent, '_handle_confirmation_response confirm intent')
 
         if intent == 'CONFIRM':
-            self.state["confirmation_status"] = "CONFIRMED"
             self._update_state_data(confirmation_status="CONFIRMED")
             return await self.process()
 
@@ -1,4 +1,5 @@
 from datetime import datetime
+from app.messages.templates import language_of, render
 from app.models.models import Message
 from app.services.bubble_client import bubble_client
 from app.utils import helpers
@@ -15,7 +16,7 @@ class StatusHandler:
         self.user_input = self.message.content
         self.intent = intent
 
-        self.collector = DataCollector(self.clinic_phone, self.user_input)
+        self.collector = DataCollector(self.clinic_phone, self.user_input, analysis=self.message.analysis)
 
     @property
     def state(self):
@@ -35,8 +36,7 @@ class StatusHandler:
         return self._update_state_expect_resp()
 
     async def _request_booking_code(self):
-        prompt = "Politely ask the user to provide a valid booking code for the appointment whose status they want to check or confirm if they prefer we fetch some of their latest appointments. Be conversational and friendly."
-        response = await invoke_ai(prompt, self.clinic_phone)
+        response = render("ask_booking_code.status", language_of(self.state))
         await self._send_response(self.clinic_phone, response)
 
     async def _fetch_appointment(self):
@@ -45,14 +45,12 @@ class StatusHandler:
         try:
             appointment = await bubble_client.find_appointment_by_code(booking_code)
         except Exception as e:
-            prompt = "Politely inform user we can't find an appointment with the provided booking code and suggest they try again."
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_not_found", language_of(self.state))
             await self._send_response(self.clinic_phone, response)
             return False
 
         if not appointment:
-            prompt = "Politely inform user we can't find an appointment with the provided booking code and suggest they try again."
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_not_found", language_of(self.state))
             await self._send_response(self.clinic_phone, response)
 
         print(appointment, 'appointment')
@@ -65,8 +63,7 @@ class StatusHandler:
             appointments = await bubble_client.find_latest_appointments(self.clinic_phone)
 
             if not appointments:
-                prompt = f"Inform {self.state.get('full_name', '')} that no appointments were found, and ask if they'd like to book one instead."
-                response = await invoke_ai(prompt, self.clinic_phone)
+                response = render("no_appointments", language_of(self.state))
                 return await self._send_response(self.clinic_phone, response)
 
             result = "Your Upcoming Appointments:\n\nPlease copy the *Booking Code* of the appointment you'd like to check and paste it in your response. 😊\n\n"
@@ -83,8 +80,7 @@ class StatusHandler:
             return await self._send_response(self.clinic_phone, result)
         except Exception as e:
             print(f"Error fetching latest appointments {str(e)}")
-            prompt = "User is trying to access their appointment details, but we encountered a technical issue while retrieving the information. Politely apologize for the inconvenience, explain that we're experiencing a temporary problem with our booking system, and ask them to try again in a few minutes or contact the clinic directly."
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_fetch_error", language_of(self.state))
             return await self._send_response(self.clinic_phone, response)
 
 
@@ -100,7 +96,7 @@ User input: "{self.user_input}"
 
 Respond with only the intent label.
 """
-        intent = await invoke_ai(prompt, self.clinic_phone)
+        intent = self.collector.confirmation_intent(["FETCH_ITEMS"]) or await invoke_ai(prompt, self.clinic_phone, call_site="confirmation_intent")
         print(intent, '_request_appointment_fetch intent')
 
         if intent == 'FETCH_ITEMS':
@@ -112,8 +108,7 @@ Respond with only the intent label.
         try:
             appointment = await self._fetch_appointment()
         except Exception as e:
-            prompt = "Politely inform user we can't find an appointment with the provided booking code and suggest they try again."
-            response = await invoke_ai(prompt, self.clinic_phone)
+            response = render("booking_not_found", language_of(self.state))
             return await self._send_response(self.clinic_phone, response)
         self._update_state_expect_resp(**{"appointment": appointment, "booking_code": booking_code})
 
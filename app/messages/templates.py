@@ -0,0 +1,168 @@
+import random
+from string import Formatter
+from typing import Any, Dict, FrozenSet, List, Optional
+from app.utils.metrics import metrics
+
+DEFAULT_LANGUAGE = "spanish"
+
+# fixed-meaning notices; every variant of a message takes the same placeholders
+CATALOG: Dict[str, Dict[str, List[str]]] = {
+    "ask_booking_code.appointment": {
+        "english": [
+            "Could you share the booking code of the appointment you'd like to manage? 😊 If you don't have it handy, just let me know and I'll fetch your latest appointments.",
+            "Sure! Please send me the booking code of the appointment. If you prefer, I can look up your most recent appointments instead.",
+        ],
+        "spanish": [
+            "¿Podrías compartirme el código de reserva de la cita que deseas gestionar? 😊 Si no lo tienes a mano, dímelo y busco tus citas más recientes.",
+            "¡Claro! Envíame el código de reserva de la cita. Si prefieres, también puedo buscar tus citas más recientes.",
+        ],
+    },
+    "ask_booking_code.edit": {
+        "english": [
+            "Happy to help you update it! Could you share the booking code of the appointment you want to edit? 😊 If you don't have it, I can fetch your latest appointments.",
+            "Sure! Please send me the booking code of the appointment you'd like to change, or let me know if you'd rather I look up your most recent appointments.",
+        ],
+        "spanish": [
+            "¡Con gusto te ayudo a modificarla! ¿Podrías compartirme el código de reserva de la cita que quieres editar? 😊 Si no lo tienes, puedo buscar tus citas más recientes.",
+            "¡Claro! Envíame el código de reserva de la cita que deseas cambiar, o dime si prefieres que busque tus citas más recientes.",
+        ],
+    },
+    "ask_booking_code.cancel": {
+        "english": [
+            "I can help with that. Could you share the booking code of the appointment you want to cancel? 😊 If you don't have it, I can fetch your latest appointments.",
+            "Sure. Please send me the booking code of the appointment you'd like to cancel, or let me know if you'd rather I look up your most recent appointments.",
+        ],
+        "spanish": [
+            "Te ayudo con eso. ¿Podrías compartirme el código de reserva de la cita que quieres cancelar? 😊 Si no lo tienes, puedo buscar tus citas más recientes.",
+            "Claro. Envíame el código de reserva de la cita que deseas cancelar, o dime si prefieres que busque tus citas más recientes.",
+        ],
+    },
+    "ask_booking_code.status": {
+        "english": [
+            "Let's check on it! Could you share the booking code of the appointment? 😊 If you don't have it, I can fetch your latest appointments.",
+            "Sure! Please send me the booking code of the appointment whose status you'd like to check, or let me know if you'd rather I look up your most recent appointments.",
+        ],
+        "spanish": [
+            "¡Vamos a revisarla! ¿Podrías compartirme el código de reserva de la cita? 😊 Si no lo tienes, puedo buscar tus citas más recientes.",
+            "¡Claro! Envíame el código de reserva de la cita cuyo estado quieres consultar, o dime si prefieres que busque tus citas más recientes.",
+        ],
+    },
+    "booking_not_found": {
+        "english": [
+            "Sorry, I couldn't find an appointment with that booking code. Could you double-check it and try again?",
+            "Hmm, no appointment matches that booking code. Please check the code and send it again. 🙏",
+        ],
+        "spanish": [
+            "Lo siento, no encontré ninguna cita con ese código de reserva. ¿Podrías revisarlo e intentarlo de nuevo?",
+            "Mmm, ninguna cita coincide con ese código de reserva. Por favor verifica el código y envíalo nuevamente. 🙏",
+        ],
+    },
+    "no_appointments": {
+        "english": [
+            "I couldn't find any appointments linked to this phone number. Please verify your information, or let me know if you'd like to book a new appointment. 😊",
+            "It looks like there are no appointments under this number yet. Would you like to book one?",
+        ],
+        "spanish": [
+            "No encontré citas asociadas a este número de teléfono. Por favor verifica tu información o dime si deseas agendar una nueva cita. 😊",
+            "Parece que aún no hay citas registradas con este número. ¿Te gustaría agendar una?",
+        ],
+    },
+    "booking_fetch_error": {
+        "english": [
+            "Sorry for the inconvenience — we're having a temporary problem with our booking system. Please try again in a few minutes or contact the clinic directly.",
+            "Apologies, I couldn't retrieve your appointment details right now due to a temporary issue. Please try again shortly or reach out to the clinic directly.",
+        ],
+        "spanish": [
+            "Disculpa las molestias: estamos teniendo un problema temporal con nuestro sistema de reservas. Por favor intenta de nuevo en unos minutos o comunícate directamente con la clínica.",
+            "Lo siento, no pude obtener los detalles de tu cita en este momento por un problema temporal. Intenta de nuevo en breve o comunícate directamente con la clínica.",
+        ],
+    },
+    "booking_updated": {
+        "english": [
+            "Your booking has been successfully updated! ✅ Is there anything else I can help you with?",
+            "All set — your appointment has been updated. ✅ Anything else you need?",
+        ],
+        "spanish": [
+            "¡Tu reserva se actualizó correctamente! ✅ ¿Hay algo más en lo que pueda ayudarte?",
+            "Listo: tu cita fue actualizada. ✅ ¿Necesitas algo más?",
+        ],
+    },
+    "booking_cancelled": {
+        "english": [
+            "Your booking has been successfully cancelled. Is there anything else I can help you with?",
+            "Done — your appointment has been cancelled. Anything else you need?",
+        ],
+        "spanish": [
+            "Tu reserva se canceló correctamente. ¿Hay algo más en lo que pueda ayudarte?",
+            "Listo: tu cita fue cancelada. ¿Necesitas algo más?",
+        ],
+    },
+    "doctor_accepted": {
+        "english": [
+            "Thank you, {full_name}, for accepting the invitation with booking code: {code}. We look forward to working with you!",
+            "Thanks, {full_name}! You've accepted the appointment with booking code: {code}. We look forward to working with you.",
+        ],
+        "spanish": [
+            "Gracias, {full_name}, por aceptar la invitación con código de reserva: {code}. ¡Esperamos trabajar contigo!",
+            "¡Gracias, {full_name}! Aceptaste la cita con código de reserva: {code}. Esperamos trabajar contigo.",
+        ],
+    },
+    "doctor_accepted_clinic": {
+        "english": [
+            "Your appointment with booking code: {code} has been accepted.",
+            "Good news! Your appointment with booking code: {code} has been accepted by a doctor.",
+        ],
+        "spanish": [
+            "Tu cita con código de reserva: {code} ha sido aceptada.",
+            "¡Buenas noticias! Un doctor aceptó tu cita con código de reserva: {code}.",
+        ],
+    },
+    "doctor_declined": {
+        "english": [
+            "Thank you, {full_name}, for letting us know. We understand your decision and hope to collaborate in the future.",
+            "Thanks for letting us know, {full_name}. We understand, and hope to work together another time.",
+        ],
+        "spanish": [
+            "Gracias, {full_name}, por avisarnos. Entendemos tu decisión y esperamos colaborar en el futuro.",
+            "Gracias por avisarnos, {full_name}. Lo entendemos y esperamos trabajar juntos en otra ocasión.",
+        ],
+    },
+}
+
+
+def _fields(template: str) -> FrozenSet[str]:
+    return frozenset(field for _, field, _, _ in Formatter().parse(template) if field)
+
+
+def _compile(catalog: Dict[str, Dict[str, List[str]]]) -> Dict[str, FrozenSet[str]]:
+    """Check the catalog once at import: every message needs variants in each
+    language and all of them must take the same placeholders."""
+    fields = {}
+    for key, languages in catalog.items():
+        expected = None
+        for language in ("english", "spanish"):
+            variants = languages.get(language)
+            if not variants:
+                raise ValueError(f"Template {key} has no {language} variants")
+            for variant in variants:
+                found = _fields(variant)
+                if expected is not None and found != expected:
+                    raise ValueError(f"Template {key} variants disagree on placeholders: {sorted(found)} != {sorted(expected)}")
+                expected = found
+        fields[key] = expected
+    return fields
+
+
+FIELDS = _compile(CATALOG)
+
+
+def language_of(state: Optional[Dict[str, Any]]) -> str:
+    language = ((state or {}).get("language") or DEFAULT_LANGUAGE).lower()
+    return language if language in ("english", "spanish") else DEFAULT_LANGUAGE
+
+
+def render(key: str, language: str = DEFAULT_LANGUAGE, **values: Any) -> str:
+    """A random variant of the message in the given language, filled with values"""
+    variants = CATALOG[key].get(language) or CATALOG[key][DEFAULT_LANGUAGE]
+    metrics.incr(f"templates.{key}")
+    return random.choice(variants).format(**values)
@@ -43,6 +43,8 @@ class Message(BaseModel):
     content: Union[str, bytes]
     timestamp: datetime
     business_phone_number_id: str
+    # result of agents.analyze_turn, filled in once per clinic turn
+    analysis: Optional[Dict[str, Any]] = None
 
 class ConversationState(BaseModel):
     current_intent: Optional[Intent] = None
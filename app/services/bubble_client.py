@@ -1,15 +1,19 @@
 from datetime import datetime
-import httpx # type: ignore
 import json
 from typing import Any, Dict, Optional
 from fastapi import HTTPException
 from app.core.config import settings
+from app.services.http_client import bubble_http
+from app.utils.cache import MISS, create_cache
 from app.utils.logger import setup_logger
-
-DEFAULT_TIMEOUT = 30
+from app.utils.singleflight import SingleFlight
 
 logger = setup_logger("bubble_api", "bubble_api.log")
 
+# shared by every BubbleApiClient so identical GETs coalesce across instances
+bubble_get_flight = SingleFlight("bubble")
+doctor_cache = create_cache("is_doctor")
+
 class DateTimeEncoder(json.JSONEncoder):
     """Custom JSON encoder for datetime objects"""
     def default(self, obj):
@@ -28,48 +32,50 @@ class BubbleApiClient:
 
     async def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None,
                            params: Optional[Dict] = None, expected_status_codes: tuple = (200, 201, 204)) -> Any:
-        """Make a request to the Bubble API with error handling"""
+        """Make a request to the Bubble API with error handling.
+
+        Concurrent identical GETs share a single in-flight request.
+        """
+        if method.lower() == "get":
+            key = (endpoint, tuple(sorted((params or {}).items())), expected_status_codes)
+            return await bubble_get_flight.do(
+                key, lambda: self._send(method, endpoint, data, params, expected_status_codes)
+            )
+        return await self._send(method, endpoint, data, params, expected_status_codes)
+
+    async def _send(self, method: str, endpoint: str, data: Optional[Dict],
+                    params: Optional[Dict], expected_status_codes: tuple) -> Any:
         url = f"{self.api_url}/{endpoint}"
 
         try:
-            async with httpx.AsyncClient() as client:
-                if method.lower() == "get":
-                    response = await client.get(
-                        url,
-                        headers=self.headers,
-                        params=params,
-                        timeout=DEFAULT_TIMEOUT
-                    )
-                elif method.lower() == "post":
-                    json_data = json.dumps(data, cls=DateTimeEncoder) if data else None
-                    response = await client.post(
-                        url,
-                        headers=self.headers,
-                        content=json_data,
-                        timeout=DEFAULT_TIMEOUT
-                    )
+            if method.lower() == "get":
+                response = await bubble_http.request(
+                    "GET",
+                    url,
+                    headers=self.headers,
+                    params=params
+                )
+            else:
+                json_data = json.dumps(data, cls=DateTimeEncoder) if data else None
+                response = await bubble_http.request(
+                    method.upper(),
+                    url,
+                    headers=self.headers,
+                    content=json_data
+                )
+
+            # Handle response status
+            if response.status_code not in expected_status_codes:
+                error_message = response.text or f"API request failed with status {response.status_code}"
+                logger.error(f"API Error: {error_message} for {method} {url}")
+
+                if response.status_code == 404:
+                    raise HTTPException(status_code=404, detail="Resource not found")
                 else:
-                    json_data = json.dumps(data, cls=DateTimeEncoder) if data else None
-                    response = await client.request(
-                        url=url,
-                        method=method.lower(),
-                        headers=self.headers,
-                        content=json_data,
-                        timeout=DEFAULT_TIMEOUT
-                    )
-
-                # Handle response status
-                if response.status_code not in expected_status_codes:
-                    error_message = response.text or f"API request failed with status {response.status_code}"
-                    logger.error(f"API Error: {error_message} for {method} {url}")
-
-                    if response.status_code == 404:
-                        raise HTTPException(status_code=404, detail="Resource not found")
-                    else:
-                        raise HTTPException(status_code=response.status_code, detail=error_message)
-
-                # Return response data for successful requests
-                return response.json() if response.content else True
+                    raise HTTPException(status_code=response.status_code, detail=error_message)
+
+            # Return response data for successful requests
+            return response.json() if response.content else True
 
         except Exception as e:
             logger.error(f"Unexpected error: {str(e)} during {method} request to {url}")
@@ -102,8 +108,12 @@ class BubbleApiClient:
         """Create a new clinic"""
         return await self._make_request("post", "clinics", data=data)
 
-    async def is_doctor(self, phone_number: str) -> Dict:
-        # @todo: use redis here...
+    async def is_doctor(self, phone_number: str) -> bool:
+        """Whether phone_number belongs to a doctor; both answers are cached"""
+        cached = await doctor_cache.get(phone_number)
+        if cached is not MISS:
+            return cached
+
         constraints = [{
             'key': 'phone_number',
             'constraint_type': 'equals',
@@ -114,10 +124,18 @@ class BubbleApiClient:
         response_data = await self._make_request("get", "doctors", params=params)
 
         results = response_data.get("response", {}).get("results", [])
-        if not results:
-            raise HTTPException(status_code=404, detail="Clinic not found")
+        is_doctor = bool(results and results[0])
+
+        ttl = settings.DOCTOR_CACHE_TTL_SECONDS if is_doctor else settings.NOT_DOCTOR_CACHE_TTL_SECONDS
+        await doctor_cache.set(phone_number, is_doctor, ttl)
+        return is_doctor
+
+    async def invalidate_doctor(self, phone_number: str):
+        await doctor_cache.delete(phone_number)
 
-        return True if results[0] else False
+    async def invalidate_doctors(self):
+        """Forget every cached is_doctor answer, e.g. after a directory import"""
+        await doctor_cache.clear()
 
     async def find_clinic_by_phone(self, phone_number: str) -> Dict:
         """Find a clinic by phone number"""
@@ -5,9 +5,10 @@ from app.services.whatsapp import WhatsAppBusinessAPI
 from crewai import Agent, Crew, Task, Process
 from langchain_openai import ChatOpenAI # type: ignore
 from app.services.bubble_client import BubbleApiClient
+from app.utils.model_routing import route_kwargs
 
 
-llm = ChatOpenAI(model="gpt-4", temperature=0.5)
+llm = ChatOpenAI(**route_kwargs("crew_agent"))
 
 user_memory = {}
 
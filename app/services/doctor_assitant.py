@@ -1,12 +1,17 @@
 
 
 from typing import Dict
+from app.messages.templates import language_of, render
 from app.models.models import ClinicState, Message
 from app.services.bubble_client import bubble_client
 from app.services.whatsapp import WhatsAppBusinessAPI
 from app.utils.doctor_state_manager import DoctorStateManager
-from app.utils.helpers import invoke_doctor_ai
+from app.utils import fast_path
+from app.utils.graph_nodes import node, turn_config
+from app.utils.helpers import get_message_history, invoke_doctor_ai
+from app.utils.intent_model import doctor_intents
 from app.utils.logger import setup_logger
+from app.utils.state_manager import StateManager
 from langgraph.graph import StateGraph, END # type: ignore
 
 state_manager = DoctorStateManager()
@@ -19,6 +24,26 @@ valid_intents = {
     "check_appointment_status": "check_appointment_status",
     "greet": "greet",
 }
+
+
+def doctor_intent_prompt(user_input: str) -> str:
+    return f"""
+Identify the primary intent of the user's message.
+
+Use the conversation history to maintain context and determine the intent.
+
+Possible intents:
+- accept: User accept the invite
+- decline: User rejects the invite
+- other: Unknown
+
+
+User message: {user_input}
+
+Respond with only the intent label.
+"""
+
+
 # memory = ConversationBufferMemory()
 class DoctorAssistant:
     def __init__(self, message: Message):
@@ -27,7 +52,6 @@ class DoctorAssistant:
         self.state_manager = DoctorStateManager()
         self.user_input = message.content
         self.doctor = self.state.get("doctor", {})
-        self.graph = self._build_graph()
     @property
     def state(self):
         return self.state_manager.get_state(self.message.phone_number)
@@ -62,34 +86,27 @@ class DoctorAssistant:
             return
 
 
-        prompt = f"""
-Identify the primary intent of the user's message.
-
-Use the conversation history to maintain context and determine the intent.
-
-Possible intents:
-- accept: User accept the invite
-- decline: User rejects the invite
-- other: Unknown
-
-
-User message: {self.user_input}
-
-Respond with only the intent label.
-"""
-        intent = await invoke_doctor_ai(prompt, phone)
+        prompt = doctor_intent_prompt(self.user_input)
+        intent = fast_path.route_doctor_reply(self.user_input)
+        if intent is None:
+            intent = doctor_intents.classify(self.user_input)
+            doctor_intents.record(used=intent is not None)
+        if intent is None:
+            intent = await invoke_doctor_ai(prompt, phone, call_site="doctor_intent")
+            doctor_intents.shadow(self.user_input, intent)
         print(intent, 'doctor classify_intent intent kkkkkkkkkkkkkkkkkkkkkkkkkkkkkkkkkkkk')
 
         if intent == 'accept':
-            prompt = f"Thank you, {full_name}, for accepting the invitation with booking code: {appointment.get('code')}. We look forward to working with you!"
-            prompt_clinic = f"Your appointment with booking code: {appointment.get('code')} has been accepted."
+            prompt = render("doctor_accepted", language_of(self.state), full_name=full_name, code=appointment.get('code'))
+            clinic_state = StateManager().get_state(appointment.get("phone_number"))
+            prompt_clinic = render("doctor_accepted_clinic", language_of(clinic_state), code=appointment.get('code'))
             data = {"status": "accepted", "assigned_doctor": doctor.get("_id")}
             await bubble_client.update_appointment(id=appointment.get("_id"), data=data)
             await self.whatsapp_service.send_text_message(prompt, phone)
             await self.whatsapp_service.send_text_message(prompt_clinic, appointment.get("phone_number"))
 
         if intent == 'decline':
-            prompt = f"Thank you, {full_name}, for letting us know. We understand your decision and hope to collaborate in the future."
+            prompt = render("doctor_declined", language_of(self.state), full_name=full_name)
             await self.whatsapp_service.send_text_message(prompt, phone)
 
 
@@ -113,43 +130,41 @@ Respond with only the intent label.
         return valid_intents.get(intent, "intro")
 
 
-    def _build_graph(self) -> StateGraph:
-        workflow = StateGraph(ClinicState)
-        # workflow.add_node("greet", self.greet)
-        workflow.add_node("classify_intent", self.classify_intent)
-        # workflow.add_node("create_appointment", self.create_appointment)
-        # workflow.add_node("edit_appointment", self.edit_appointment)
-        # workflow.add_node("cancel_appointment", self.cancel_appointment)
-        # workflow.add_node("check_appointment_status", self.check_appointment_status)
-        # workflow.add_node("prompt_doctors", self.prompt_doctors)
-        # workflow.add_node("wrap_up", self.wrap_up)
-        # workflow.add_node("intro", self.intro)
-        workflow.add_node("pause", self.pause)
-
-        workflow.set_entry_point("classify_intent")
-        # workflow.add_conditional_edges("greet", self._route_after_greet)
-        # workflow.add_conditional_edges("classify_intent", self._route_after_classify)
-        # workflow.add_conditional_edges("create_appointment", self._route_after_create_appointment)
-        # workflow.add_conditional_edges("edit_appointment", self._route_after_edit_appointment)
-        # workflow.add_conditional_edges("cancel_appointment", self._route_after_cancel_appointment)
-        # workflow.add_conditional_edges("prompt_doctors", self._route_after_prompt_doctors)
-        # workflow.add_conditional_edges("check_appointment_status", self._route_after_check_appointment_status)
-        # workflow.add_conditional_edges("wrap_up", self._route_after_wrap_up)
-        # workflow.add_conditional_edges("intro", "classify_intent")
-
-        return workflow.compile()
-
     async def process_message(self, phone: str, user_input: str) -> str:
+        self.state_manager.update_state(phone, {
+            "user_input": user_input,
+            "phone": phone,
+            "needs_clarification": False
+        })
         state = self.state_manager.get_state(phone)
-        state["user_input"] = user_input
-        state["phone"] = phone
-        state["needs_clarification"] = False
+        if isinstance(user_input, str) and user_input.strip():
+            get_message_history(phone).add_user_message(user_input)
 
         final_response = None
-        async for output in self.graph.astream(
-            state,
-            config={"configurable": {"session_id": phone}}
-        ):
+        async for output in graph.astream(state, config=turn_config(self, phone)):
             logger.info(f"Node output: {output}")
 
         return final_response or "Something went wrong. Please try again."
+
+
+def _build_graph():
+    workflow = StateGraph(ClinicState)
+    # workflow.add_node("greet", node("greet"))
+    workflow.add_node("classify_intent", node("classify_intent"))
+    # workflow.add_node("create_appointment", node("create_appointment"))
+    # workflow.add_node("edit_appointment", node("edit_appointment"))
+    # workflow.add_node("cancel_appointment", node("cancel_appointment"))
+    # workflow.add_node("check_appointment_status", node("check_appointment_status"))
+    # workflow.add_node("prompt_doctors", node("prompt_doctors"))
+    # workflow.add_node("wrap_up", node("wrap_up"))
+    # workflow.add_node("intro", node("intro"))
+    workflow.add_node("pause", node("pause"))
+
+    workflow.set_entry_point("classify_intent")
+    # workflow.add_conditional_edges("classify_intent", route("_route_after_classify"))
+
+    return workflow.compile()
+
+
+# compiled once per process; each turn passes its DoctorAssistant through the run config
+graph = _build_graph()
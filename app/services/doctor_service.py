@@ -49,7 +49,8 @@ Let me know if this works for you. ✅
             # response = await invoke_doctor_ai(prompt, phone)
 
             # update state, db too...
-            self.state_manager.update_state(phone, {"appointment": appointment, "doctor": best_doctor})
+            async with self.state_manager.lock(phone):
+                self.state_manager.update_state(phone, {"appointment": appointment, "doctor": best_doctor})
             print('phone number', best_doctor.get('phone_number'))
             await self.whatsapp_service.send_text_message(prompt, to_number=phone)
         except Exception as e:
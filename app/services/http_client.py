@@ -0,0 +1,107 @@
+from typing import Any, List, Optional
+import httpx # type: ignore
+from app.core.config import settings
+from app.utils.logger import setup_logger
+from app.utils.metrics import metrics
+
+logger = setup_logger("http_client", "http_client.log")
+
+_clients: List["PooledHttpClient"] = []
+
+
+def _http2_available() -> bool:
+    try:
+        import h2 # type: ignore # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class PooledHttpClient:
+    """Process-wide httpx.AsyncClient with keep-alive pooling.
+
+    The underlying client is created on first use and closed from the app
+    lifespan, so every request to the same host reuses warm connections
+    instead of paying a fresh TCP+TLS handshake.
+    """
+
+    def __init__(self, name: str, http2: bool = False, max_connections: int = 50,
+                 max_keepalive_connections: int = 20, keepalive_expiry: float = 60.0,
+                 timeout: float = 30.0, connect_timeout: float = 5.0):
+        self.name = name
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            logger.warning(f"h2 is not installed, {name} client falls back to HTTP/1.1")
+
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._client: Optional[httpx.AsyncClient] = None
+        _clients.append(self)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(http2=self.http2, limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send through the pool, counting requests and new connections.
+
+        Requests minus connections is the number served on a reused
+        keep-alive connection (or multiplexed onto an HTTP/2 one).
+        """
+        extensions = {**kwargs.pop("extensions", {}), "trace": self._trace}
+        metrics.incr(f"http.{self.name}.requests")
+        return await self.client.request(method, url, extensions=extensions, **kwargs)
+
+    async def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            metrics.incr(f"http.{self.name}.connections")
+
+    def stats(self) -> dict:
+        requests = metrics.counters.get(f"http.{self.name}.requests", 0)
+        connections = metrics.counters.get(f"http.{self.name}.connections", 0)
+        return {
+            "requests": requests,
+            "connections": connections,
+            "reused": max(0, requests - connections),
+            "reuse_rate": (requests - connections) / requests if requests else 0.0,
+        }
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+async def close_http_clients():
+    for pooled in _clients:
+        try:
+            await pooled.aclose()
+        except Exception as e:
+            logger.error(f"Error closing {pooled.name} http client: {e}")
+
+
+whatsapp_http = PooledHttpClient(
+    "whatsapp",
+    http2=settings.WHATSAPP_HTTP2,
+    max_connections=settings.WHATSAPP_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.WHATSAPP_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.WHATSAPP_KEEPALIVE_EXPIRY,
+    timeout=settings.WHATSAPP_TIMEOUT,
+    connect_timeout=settings.WHATSAPP_CONNECT_TIMEOUT
+)
+
+bubble_http = PooledHttpClient(
+    "bubble",
+    http2=settings.BUBBLE_HTTP2,
+    max_connections=settings.BUBBLE_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.BUBBLE_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.BUBBLE_KEEPALIVE_EXPIRY,
+    timeout=settings.BUBBLE_TIMEOUT,
+    connect_timeout=settings.BUBBLE_CONNECT_TIMEOUT
+)
@@ -1,5 +1,6 @@
 
-from typing import Dict
+from typing import Dict, List, Optional
+from app.agents import agents
 from app.handler.cancel_handler import CancelHandler
 from app.handler.edit_handler import EditHandler
 from app.handler.greet import GreetingHandler
@@ -7,9 +8,14 @@ from app.handler.procedure_collector import ProcedureCollector
 from app.handler.status_handler import StatusHandler
 from app.models.models import ClinicState, Message
 from app.services.whatsapp import WhatsAppBusinessAPI
-from app.utils.helpers import invoke_ai, send_response
+from app.utils import fast_path
+from app.utils.graph_nodes import node, route, turn_config
+from app.utils.helpers import get_message_history, invoke_ai, send_response
+from app.utils.intent_model import clinic_intents
+from app.utils.local_extractor import extract_local, fill_missing
 from app.utils.logger import setup_logger
 from app.utils.state_manager import StateManager
+from app.utils.token_budget import budget_for, trim_text
 from langgraph.graph import StateGraph, END # type: ignore
 from datetime import datetime, timedelta
 import openai
@@ -39,13 +45,46 @@ valid_intents = {
     "language_spanish": "language_spanish",
     "greet": "greet",
 }
+# every entity a clinic turn can be asked for, extracted up front by the turn analysis
+TURN_ENTITY_KEYS = [
+    "full_name", "clinic_name", "service_type", "patient_gender", "location",
+    "patient_name", "patient_age_range", "date", "time", "additional_note"
+]
+# what the greeting and the booking flow ask for until each is filled in
+REGISTRATION_KEYS = ["full_name", "clinic_name"]
+BOOKING_KEYS = ["service_type", "patient_gender", "location", "patient_name", "patient_age_range", "date", "time"]
+# intents the local classifier may settle on its own: their nodes need no entities or confirmation
+SELF_CONTAINED_INTENTS = {"greet", "language_english", "language_spanish", "other"}
+
+
+def classify_intent_prompt(user_input: str) -> str:
+    return f"""
+Identify the primary intent of the user's message.
+
+Use the conversation history to maintain context and determine the intent.
+
+Possible intents:
+- create_appointment: User wants to book a new appointment
+- cancel_appointment: User wants to cancel an existing appointment
+- edit_appointment: User wants to change or update an existing appointment
+- check_appointment_status: User wants to check the status of an existing appointment
+- language_english: User indicates preference for English language
+- language_spanish: User indicates preference for Mexican Spanish language
+- greet: User is greeting the system
+- other: None of the above
+
+User message: {trim_text(user_input, budget_for("classify_intent") // 2)}
+
+Respond with only the intent label.
+"""
+
+
 # memory = ConversationBufferMemory()
 class ClinicAssistant:
     def __init__(self, message: Message):
         self.message = message
         self.whatsapp_service = WhatsAppBusinessAPI(message)
         self.state_manager = StateManager()
-        self.graph = self._build_graph()
     @property
     def state(self):
         return self.state_manager.get_state(self.message.phone_number)
@@ -103,26 +142,18 @@ class ClinicAssistant:
         if state.get("confirmation_status") == "PENDING":
             return self._update_state({ "intent": state.get("intent") })
 
-        prompt = f"""
-Identify the primary intent of the user's message.
-
-Use the conversation history to maintain context and determine the intent.
-
-Possible intents:
-- create_appointment: User wants to book a new appointment
-- cancel_appointment: User wants to cancel an existing appointment
-- edit_appointment: User wants to change or update an existing appointment
-- check_appointment_status: User wants to check the status of an existing appointment
-- language_english: User indicates preference for English language
-- language_spanish: User indicates preference for Mexican Spanish language
-- greet: User is greeting the system
-- other: None of the above
-
-User message: {user_input}
-
-Respond with only the intent label.
-"""
-        intent = await invoke_ai(prompt, clinic_phone)
+        prompt = classify_intent_prompt(user_input)
+        analysis = self.message.analysis
+        if analysis:
+            intent = analysis["intent"]
+            if analysis.get("source") == "turn_analysis":
+                clinic_intents.shadow(user_input, intent)
+        else:
+            intent = clinic_intents.classify(user_input)
+            clinic_intents.record(used=intent is not None)
+            if intent is None:
+                intent = await invoke_ai(prompt, clinic_phone, call_site="classify_intent")
+                clinic_intents.shadow(user_input, intent)
         print(intent, 'classify_intent intent kkkkkkkkkkkkkkkkkkkkkkkkkkkkkkkkkkkk')
 
         if intent == "language_english":
@@ -250,44 +281,91 @@ Respond with only the intent label.
             return END
         return "intro"
 
-    def _build_graph(self) -> StateGraph:
-        workflow = StateGraph(ClinicState)
-        workflow.add_node("greet", self.greet)
-        workflow.add_node("classify_intent", self.classify_intent)
-        workflow.add_node("create_appointment", self.create_appointment)
-        workflow.add_node("edit_appointment", self.edit_appointment)
-        workflow.add_node("cancel_appointment", self.cancel_appointment)
-        workflow.add_node("check_appointment_status", self.check_appointment_status)
-        workflow.add_node("prompt_doctors", self.prompt_doctors)
-        workflow.add_node("wrap_up", self.wrap_up)
-        workflow.add_node("intro", self.intro)
-        workflow.add_node("pause", self.pause)
-
-        workflow.set_entry_point("classify_intent")
-        workflow.add_conditional_edges("greet", self._route_after_greet)
-        workflow.add_conditional_edges("classify_intent", self._route_after_classify)
-        workflow.add_conditional_edges("create_appointment", self._route_after_create_appointment)
-        workflow.add_conditional_edges("edit_appointment", self._route_after_edit_appointment)
-        workflow.add_conditional_edges("cancel_appointment", self._route_after_cancel_appointment)
-        workflow.add_conditional_edges("prompt_doctors", self._route_after_prompt_doctors)
-        workflow.add_conditional_edges("check_appointment_status", self._route_after_check_appointment_status)
-        workflow.add_conditional_edges("wrap_up", self._route_after_wrap_up)
-        # workflow.add_conditional_edges("intro", "classify_intent")
-
-        return workflow.compile()
+    def _local_intent(self, user_input: str, state: Dict) -> Optional[Dict]:
+        """Intent-only analysis from the local classifier for turns that need nothing else.
+
+        Only used outside a flow and for intents whose handlers never
+        extract entities or ask for a confirmation; the turn counts as
+        answered locally only then.
+        """
+        if not state.get("clinic_name") or not state.get("full_name") or state.get("confirmation_status") == "PENDING":
+            return None
+        intent = clinic_intents.classify(user_input)
+        # any other label still needs the turn analysis, so the LLM is called all the same
+        clinic_intents.record(used=intent in SELF_CONTAINED_INTENTS)
+        if intent not in SELF_CONTAINED_INTENTS:
+            return None
+        return {"intent": intent, "source": "intent_model"}
+
+    @staticmethod
+    def _asked_keys(state: Dict) -> List[str]:
+        """Entity keys the current step is waiting for: the still missing registration or booking fields"""
+        if state.get("confirmation_status") == "PENDING":
+            return []
+        if not state.get("clinic_name") or not state.get("full_name"):
+            keys = REGISTRATION_KEYS
+        elif state.get("intent") == "create_appointment":
+            keys = BOOKING_KEYS
+        else:
+            return []
+        return [key for key in keys if not state.get(key)]
+
+    async def _analyze_turn(self, clinic_phone: str, user_input: str, state: Dict) -> Optional[Dict]:
+        """Answer every question the graph and handlers may ask about this message in one call"""
+        history = "\n".join(f"{message.type}: {message.content}" for message in get_message_history(clinic_phone).messages)
+        context = f"intent={state.get('intent')}, confirmation_status={state.get('confirmation_status')}"
+        analysis = await agents.analyze_turn(user_input, TURN_ENTITY_KEYS, history=history, context=context)
+        if analysis:
+            # local parses only fill in what the step asked for and the LLM left empty
+            local = extract_local(user_input, self._asked_keys(state) + ["booking_code"])
+            analysis["booking_code"] = analysis.get("booking_code") or local.pop("booking_code", None)
+            analysis["entities"] = fill_missing(analysis["entities"], local)
+            analysis["source"] = "turn_analysis"
+        return analysis
 
     async def process_message(self, clinic_phone: str, user_input: str) -> str:
+        state_manager.update_state(clinic_phone, {
+            "user_input": user_input,
+            "clinic_phone": clinic_phone,
+            "needs_clarification": False
+        })
         state = state_manager.get_state(clinic_phone)
-        state["user_input"] = user_input
-        state["clinic_phone"] = clinic_phone
-        state["needs_clarification"] = False
+
+        analysis = fast_path.route(user_input, state, TURN_ENTITY_KEYS, interactive=self.message.type == "interactive")
+        # without the turn analysis, classify_intent asks the local model itself
+        if analysis is None and settings.TURN_ANALYSIS_ENABLED:
+            analysis = self._local_intent(user_input, state) or await self._analyze_turn(clinic_phone, user_input, state)
+        self.message = self.message.model_copy(update={"analysis": analysis})
+        if isinstance(user_input, str) and user_input.strip():
+            get_message_history(clinic_phone).add_user_message(user_input)
 
         final_response = None
-        async for output in self.graph.astream(
-            state,
-            config={"configurable": {"session_id": clinic_phone}}
-        ):
+        async for output in graph.astream(state, config=turn_config(self, clinic_phone)):
             logger.info(f"Node output: {output}")
             # state_manager.clear_state(clinic_phone)
 
         return final_response or "Something went wrong. Please try again."
+
+
+def _build_graph():
+    workflow = StateGraph(ClinicState)
+    for name in ("greet", "classify_intent", "create_appointment", "edit_appointment", "cancel_appointment",
+                 "check_appointment_status", "prompt_doctors", "wrap_up", "intro", "pause"):
+        workflow.add_node(name, node(name))
+
+    workflow.set_entry_point("classify_intent")
+    workflow.add_conditional_edges("greet", route("_route_after_greet"))
+    workflow.add_conditional_edges("classify_intent", route("_route_after_classify"))
+    workflow.add_conditional_edges("create_appointment", route("_route_after_create_appointment"))
+    workflow.add_conditional_edges("edit_appointment", route("_route_after_edit_appointment"))
+    workflow.add_conditional_edges("cancel_appointment", route("_route_after_cancel_appointment"))
+    workflow.add_conditional_edges("prompt_doctors", route("_route_after_prompt_doctors"))
+    workflow.add_conditional_edges("check_appointment_status", route("_route_after_check_appointment_status"))
+    workflow.add_conditional_edges("wrap_up", route("_route_after_wrap_up"))
+    # workflow.add_conditional_edges("intro", "classify_intent")
+
+    return workflow.compile()
+
+
+# compiled once per process; each turn passes its ClinicAssistant through the run config
+graph = _build_graph()
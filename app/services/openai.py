@@ -1,24 +1,140 @@
-import os
-from openai import OpenAI
-from typing import List, Dict
+import time
+from openai import APIConnectionError, AsyncOpenAI, InternalServerError # type: ignore
+from typing import Any, List, Dict, Optional
 from app.core.config import settings
+from app.utils.hedging import hedged_call
+from app.utils.metrics import count_llm_call, metrics
+from app.utils.model_routing import route_for
+from app.utils.rate_limiter import openai_limiter, priority_for
+from app.utils.token_budget import budget_for, record_usage
+from app.utils.tokens import count_message_tokens
+
+# reserved in the token bucket for completions without max_tokens, settled against actual usage
+EXPECTED_COMPLETION_TOKENS = 256
+# retried by the limiter besides 429s
+TRANSIENT_ERRORS = (APIConnectionError, InternalServerError)
+
+_client: Optional[AsyncOpenAI] = None
+_fallback_client: Optional[AsyncOpenAI] = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Process-wide AsyncOpenAI client; its connection pool is shared by every call.
+
+    The SDK's own retries are off: openai_limiter retries, so that it sees
+    every 429 and can back off.
+    """
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=settings.OPENAI_TIMEOUT,
+            max_retries=0
+        )
+    return _client
+
+
+def get_fallback_client() -> AsyncOpenAI:
+    """Client for LLM_FALLBACK_MODEL: its own provider when LLM_FALLBACK_BASE_URL is set, else the shared client"""
+    global _fallback_client
+    if not settings.LLM_FALLBACK_BASE_URL:
+        return get_openai_client()
+    if _fallback_client is None:
+        _fallback_client = AsyncOpenAI(
+            api_key=settings.LLM_FALLBACK_API_KEY or settings.OPENAI_API_KEY,
+            base_url=settings.LLM_FALLBACK_BASE_URL,
+            timeout=settings.LLM_FALLBACK_DEADLINE_SECONDS,
+            max_retries=0
+        )
+    return _fallback_client
+
+
+def reserved_tokens(messages: List[Any], model: str, max_tokens: Optional[int] = None) -> int:
+    """Tokens to reserve in the limiter for a call: the prompt plus the expected completion"""
+    return count_message_tokens(messages, model) + (max_tokens or EXPECTED_COMPLETION_TOKENS)
+
+
+async def chat_completion(messages: List[Dict[str, str]], model: Optional[str] = None,
+                          temperature: Optional[float] = None, call_site: str = "default",
+                          priority: Optional[int] = None, **kwargs: Any) -> Any:
+    """Create a chat completion without blocking the event loop.
+
+    model, temperature and max_tokens default to the call site's route
+    (see route_for); pass them to override it.
+
+    Calls go through openai_limiter, which keeps them within the RPM/TPM
+    limits and the adaptive concurrency limit, queues them by priority
+    (see priority_for) and retries rate-limited and transient failures.
+    The whole call is bounded by the call site's deadline, with hedging
+    and the fallback model as in hedged_call. Tokens and latency are
+    recorded against call_site.
+    """
+    route = route_for(call_site)
+    model = model or route.model
+    temperature = route.temperature if temperature is None else temperature
+    if route.max_tokens and "max_tokens" not in kwargs:
+        kwargs["max_tokens"] = route.max_tokens
+    reserved = reserved_tokens(messages, model, kwargs.get("max_tokens"))
+
+    async def create(client: AsyncOpenAI, model: str):
+        count_llm_call()
+        started = time.perf_counter()
+        try:
+            return await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                **kwargs
+            )
+        finally:
+            metrics.incr("openai.calls")
+            metrics.observe("openai.call_ms", (time.perf_counter() - started) * 1000)
+
+    def attempt(fallback: bool):
+        if fallback:
+            # late already: go ahead of everything queued
+            call, call_priority = lambda: create(get_fallback_client(), settings.LLM_FALLBACK_MODEL), 0
+        else:
+            call, call_priority = lambda: create(get_openai_client(), model), priority_for(call_site, priority)
+        return openai_limiter.call(
+            call, reserved, call_priority,
+            usage=lambda response: response.usage.total_tokens if response.usage else None,
+            retry_on=TRANSIENT_ERRORS
+        )
+
+    started = time.perf_counter()
+    response = await hedged_call(call_site, attempt)
+
+    usage = response.usage
+    prompt_tokens = usage.prompt_tokens if usage else count_message_tokens(messages, model)
+    completion_tokens = usage.completion_tokens if usage else 0
+    record_usage(call_site, prompt_tokens, completion_tokens, (time.perf_counter() - started) * 1000, budget_for(call_site))
+    return response
+
+
+async def close_openai_client():
+    global _client, _fallback_client
+    if _client is not None:
+        await _client.close()
+        _client = None
+    if _fallback_client is not None:
+        await _fallback_client.close()
+        _fallback_client = None
+
 
 class OpenAIService:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = get_openai_client()
 
-    def create_agent_completion(
+    async def create_agent_completion(
         self,
         messages: List[Dict[str, str]],
-        model: str = "gpt-3.5-turbo",
-        temperature: float = 0.7
+        model: Optional[str] = None,
+        temperature: Optional[float] = None
     ) -> str:
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature
-            )
+            response = await chat_completion(messages, model=model, temperature=temperature, call_site="agent_completion")
             return response.choices[0].message.content.strip()
         except Exception as e:
             print(f"OpenAI API Error: {e}")
@@ -1,8 +1,8 @@
 from datetime import datetime, timedelta
 from app.core.config import settings
 from app.models.models import Message
+from app.services.http_client import whatsapp_http
 from app.utils.state_manager import StateManager
-import httpx # type: ignore
 from app.utils.logger import setup_logger
 from typing import Dict, List, Optional, Union, Tuple
 import calendar
@@ -25,7 +25,7 @@ class WhatsAppBusinessAPI:
 
         self.state_manager = StateManager()
         self.state = self.state_manager.get_state(message.phone_number)
-        self.base_url = f"https://graph.facebook.com/v18.0/{self.business_phone_number_id}"
+        self.base_url = f"{settings.GRAPH_API_URL}/{self.business_phone_number_id}"
         self.headers = {"Authorization": f"Bearer {settings.GRAPH_API_TOKEN}"}
 
     async def send_text_message(self, message: str, to_number: Optional[str] = None, reply_to_message_id: Optional[str] = None) -> Dict:
@@ -434,32 +434,27 @@ class WhatsAppBusinessAPI:
 
     async def _make_request(self, endpoint: str, payload: Dict) -> Dict:
         """Make HTTP request to WhatsApp API"""
-        to_number = payload.get("to")
         # if to_number != '2348099868604':
         #     payload["text"]['body'] = 'We are actively developing, please check back'
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{self.base_url}{endpoint}",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30.0
-                )
-
-                if response.status_code != 200:
-                    logger.error(f"API request failed: {response.text}")
-                    return {"error": response.text, "status_code": response.status_code}
-
-                # self._update_conversation_state(payload)
-
-                return response.json()
-            except Exception as e:
-                logger.error(f"Request failed: {str(e)}")
-                return {"error": str(e)}
-            finally:
-                if to_number:
-                    self.state_manager.update_state(to_number, {"is_processing":False})
+        try:
+            response = await whatsapp_http.request(
+                "POST",
+                f"{self.base_url}{endpoint}",
+                headers=self.headers,
+                json=payload
+            )
+
+            if response.status_code != 200:
+                logger.error(f"API request failed: {response.text}")
+                return {"error": response.text, "status_code": response.status_code}
+
+            # self._update_conversation_state(payload)
+
+            return response.json()
+        except Exception as e:
+            logger.error(f"Request failed: {str(e)}")
+            return {"error": str(e)}
 
     def _update_conversation_state(self, payload):
             phone_number = payload.get('to')
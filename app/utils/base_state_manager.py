@@ -0,0 +1,174 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from weakref import WeakValueDictionary
+from app.core.config import settings
+from app.utils.metrics import metrics
+from app.utils.state_store import StateStore, create_archive_store, create_state_store
+
+VERSION_KEY = "_version"
+UPDATED_AT_KEY = "_updated_at"
+# bound the work one access can spend evicting idle conversations
+MAX_EVICTIONS_PER_ACCESS = 100
+
+
+class StateConflictError(Exception):
+    def __init__(self, phone: str, expected_version: int, actual_version: int):
+        self.phone = phone
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+        super().__init__(f"State for {phone} is at version {actual_version}, expected {expected_version}")
+
+
+class BaseStateManager:
+    """Per-phone conversation state kept resident in memory over a StateStore.
+
+    Records are versioned and never mutated in place: get_state hands out a
+    copy and update_state swaps in a new record, optionally only if the
+    caller's expected_version still matches (compare-and-swap). Turns that
+    read, await and then write should hold lock(phone) for the duration.
+
+    Resident records are kept in LRU order and evicted once idle for
+    idle_ttl seconds or when more than max_resident are held. Evicted
+    records go to the archive store (or simply stay in the primary store
+    for backends that are already on disk) and are rehydrated on next use.
+    """
+    _instance = None
+    storage_file = ""
+    table = ""
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(BaseStateManager, cls).__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self, store: Optional[StateStore] = None, archive: Optional[StateStore] = None,
+                    idle_ttl: float = settings.STATE_IDLE_TTL_SECONDS, max_resident: int = settings.STATE_MAX_RESIDENT):
+        self.store = store or create_state_store(self.table, self.storage_file)
+        self.archive = archive if store else create_archive_store(self.table)
+        self.idle_ttl = idle_ttl
+        self.max_resident = max_resident
+        self.evictions = 0
+        self.rehydrations = 0
+        self._locks: "WeakValueDictionary[str, asyncio.Lock]" = WeakValueDictionary()
+
+        now = time.time()
+        loaded = sorted(self.store.load_all().items(), key=lambda item: item[1].get(UPDATED_AT_KEY, now))
+        self.states: "OrderedDict[str, Dict[str, Any]]" = OrderedDict(loaded)
+        self._accessed: Dict[str, float] = {key: record.get(UPDATED_AT_KEY, now) for key, record in loaded}
+
+        metrics.register_gauge(f"state.{self.table}.resident", lambda: len(self.states))
+        metrics.register_gauge(f"state.{self.table}.evictions", lambda: self.evictions)
+        metrics.register_gauge(f"state.{self.table}.rehydrations", lambda: self.rehydrations)
+
+    def default_state(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def _get_record(self, phone: str) -> Optional[Dict[str, Any]]:
+        record = self.states.get(phone)
+        if record is None:
+            record = self._rehydrate(phone)
+            if record is None:
+                return None
+            self.states[phone] = record
+
+        self._touch(phone)
+        return record
+
+    def _rehydrate(self, phone: str) -> Optional[Dict[str, Any]]:
+        record = self.store.load(phone)
+        if record is None and self.archive is not None:
+            record = self.archive.load(phone)
+            if record is not None:
+                self.store.save(phone, record)
+                self.archive.delete(phone)
+
+        if record is not None:
+            self.rehydrations += 1
+        return record
+
+    def _touch(self, phone: str):
+        now = time.time()
+        self.states.move_to_end(phone)
+        self._accessed[phone] = now
+        self._evict(now)
+
+    def _evict(self, now: float):
+        evicted = 0
+        while len(self.states) > 1 and evicted < MAX_EVICTIONS_PER_ACCESS:
+            oldest = next(iter(self.states))
+            over_cap = len(self.states) > self.max_resident
+            idle = now - self._accessed.get(oldest, now) > self.idle_ttl
+            if not (over_cap or idle):
+                break
+            self._evict_one(oldest)
+            evicted += 1
+
+    def _evict_one(self, phone: str):
+        record = self.states.pop(phone)
+        self._accessed.pop(phone, None)
+        if self.archive is not None:
+            self.archive.save(phone, record)
+            self.store.delete(phone)
+        self.evictions += 1
+
+    def lock(self, phone: str) -> asyncio.Lock:
+        """Async lock serialising read-modify-write turns for one phone"""
+        lock = self._locks.get(phone)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[phone] = lock
+        return lock
+
+    def get_state(self, phone: str) -> Dict[str, Any]:
+        record = self._get_record(phone)
+        if record is None:
+            return self.default_state()
+        return dict(record)
+
+    def get_version(self, phone: str) -> int:
+        record = self._get_record(phone)
+        return record.get(VERSION_KEY, 0) if record else 0
+
+    def update_state(self, phone: str, updates: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        """Apply updates and return the new version.
+
+        Raises StateConflictError when expected_version is given and another
+        writer has bumped the record since it was read.
+        """
+        record = self._get_record(phone)
+        current_version = record.get(VERSION_KEY, 0) if record else 0
+
+        if expected_version is not None and expected_version != current_version:
+            metrics.incr("state.conflicts")
+            raise StateConflictError(phone, expected_version, current_version)
+
+        base = record if record is not None else self.default_state()
+        new_record = {**base, **updates, VERSION_KEY: current_version + 1, UPDATED_AT_KEY: time.time()}
+        self.states[phone] = new_record
+        if record is None:
+            self._touch(phone)
+        self.store.save(phone, new_record)
+        return current_version + 1
+
+    def clear_state(self, phone: str):
+        self.states.pop(phone, None)
+        self._accessed.pop(phone, None)
+        self.store.delete(phone)
+        if self.archive is not None:
+            self.archive.delete(phone)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "resident": len(self.states),
+            "max_resident": self.max_resident,
+            "evictions": self.evictions,
+            "rehydrations": self.rehydrations,
+        }
+
+    def flush(self):
+        self.store.flush()
+        if self.archive is not None:
+            self.archive.flush()
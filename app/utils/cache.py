@@ -0,0 +1,144 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+from app.core.config import settings
+from app.utils.logger import setup_logger
+from app.utils.metrics import metrics
+
+logger = setup_logger("cache", "cache.log")
+
+# returned by get() so a cached None/False can be told apart from a miss
+MISS = object()
+
+_caches: List["Cache"] = []
+
+
+class Cache:
+    """Async key/value cache with per-entry TTLs, scoped to one namespace"""
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        _caches.append(self)
+
+    async def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def clear(self):
+        """Drop every entry in this namespace"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    def _record(self, hit: bool):
+        metrics.incr(f"cache.{self.namespace}.{'hits' if hit else 'misses'}")
+
+
+class MemoryCache(Cache):
+    """In-process LRU capped at max_entries; expired entries are dropped on read"""
+
+    def __init__(self, namespace: str, max_entries: int = 10_000):
+        super().__init__(namespace)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        metrics.register_gauge(f"cache.{namespace}.entries", lambda: len(self._entries))
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            self._entries.pop(key, None)
+            self._record(False)
+            return MISS
+
+        self._entries.move_to_end(key)
+        self._record(True)
+        return entry[1]
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+
+class RedisCache(Cache):
+    """Cache on any Redis-protocol server; values are stored as JSON.
+
+    Errors talking to the server are logged and treated as misses so a
+    cache outage falls back to the origin rather than failing the turn.
+    """
+
+    def __init__(self, namespace: str, url: str):
+        super().__init__(namespace)
+        import redis.asyncio as redis # type: ignore
+
+        self.url = url
+        self._redis = redis.from_url(url)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Any:
+        try:
+            raw = await self._redis.get(self._key(key))
+        except Exception as e:
+            logger.error(f"Redis get failed for {self._key(key)}: {e}")
+            self._record(False)
+            return MISS
+
+        if raw is None:
+            self._record(False)
+            return MISS
+        self._record(True)
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        try:
+            await self._redis.set(self._key(key), json.dumps(value), px=max(1, int(ttl * 1000)))
+        except Exception as e:
+            logger.error(f"Redis set failed for {self._key(key)}: {e}")
+
+    async def delete(self, key: str):
+        try:
+            await self._redis.delete(self._key(key))
+        except Exception as e:
+            logger.error(f"Redis delete failed for {self._key(key)}: {e}")
+
+    async def clear(self):
+        try:
+            keys = [key async for key in self._redis.scan_iter(match=f"{self.namespace}:*")]
+            if keys:
+                await self._redis.delete(*keys)
+        except Exception as e:
+            logger.error(f"Redis clear failed for {self.namespace}: {e}")
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_cache(namespace: str, max_entries: Optional[int] = None) -> Cache:
+    """Build the backend selected by CACHE_BACKEND ("memory" or "redis")"""
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCache(namespace, settings.REDIS_URL)
+    return MemoryCache(namespace, max_entries or settings.CACHE_MAX_ENTRIES)
+
+
+async def close_caches():
+    for cache in _caches:
+        try:
+            await cache.close()
+        except Exception as e:
+            logger.error(f"Error closing {cache.namespace} cache: {e}")
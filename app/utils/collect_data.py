@@ -1,28 +1,54 @@
 from typing import Any, Dict, List, Optional
 from app.agents import agents
+from app.utils.local_extractor import extract_local, fill_missing
 from app.utils.state_manager import StateManager
 
 class DataCollector:
-    def __init__(self, clinic_phone: str, user_input: str):
+    def __init__(self, clinic_phone: str, user_input: str, analysis: Optional[Dict[str, Any]] = None):
         self.state_manager = StateManager()
         self.clinic_phone = clinic_phone
         self.user_input = user_input
+        self.analysis = analysis
 
     async def extract_entity(self, entity_key: str) -> Optional[str]:
         """Extract a single entity from user input"""
-        extracted_data = await agents.extractor([entity_key], self.user_input)
-        cleaned_data = self._clean_data(extracted_data)
-        return cleaned_data.get(entity_key)
+        extracted_data = await self.extract_entities([entity_key])
+        return extracted_data.get(entity_key)
 
     async def extract_entities(self, requested_keys: List[str]) -> Dict[str, Any]:
-        """Extract multiple entities from user input"""
+        """Extract multiple entities from user input.
+
+        Uses the turn analysis when there is one; otherwise every key goes
+        to the LLM extractor, and the dates, times, ages, genders and
+        booking codes parsed locally fill in what it left empty.
+        """
         if not requested_keys:
             return {}
 
-        extracted_data = await agents.extractor(requested_keys, self.user_input)
+        extracted_data = self._from_analysis(requested_keys)
+        if extracted_data is None:
+            extracted_data = fill_missing(await agents.extractor(requested_keys, self.user_input),
+                                          extract_local(self.user_input, requested_keys))
         cleaned_data = self._clean_data(extracted_data)
         return cleaned_data
 
+    def confirmation_intent(self, allowed: List[str]) -> Optional[str]:
+        """The turn analysis' confirmation intent narrowed to allowed (else OTHER); None without an analysis"""
+        intent = (self.analysis or {}).get("confirmation_intent")
+        if intent is None:
+            return None
+        return intent if intent in allowed else "OTHER"
+
+    def _from_analysis(self, requested_keys: List[str]) -> Optional[Dict[str, Any]]:
+        """Requested entities from the turn analysis, or None if it did not cover them all"""
+        if not self.analysis or "entities" not in self.analysis:
+            return None
+
+        values = {**self.analysis["entities"], "booking_code": self.analysis.get("booking_code")}
+        if any(key not in values for key in requested_keys):
+            return None
+        return {key: values[key] for key in requested_keys}
+
     def _clean_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Remove invalid values from extracted data"""
         return {
@@ -0,0 +1,130 @@
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.utils.logger import setup_logger
+from app.utils.metrics import metrics
+
+logger = setup_logger("dedup", "dedup.log")
+
+
+class SeenMessageIndex:
+    """Bounded, TTL-evicting index of WhatsApp message ids we already accepted.
+
+    Lookups only touch the in-memory OrderedDict. When a db_path is given the
+    ids are also written to SQLite so retries that straddle a restart are
+    still recognised.
+    """
+
+    def __init__(self, ttl_seconds: float = 86400, max_entries: int = 100_000, db_path: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        # sizes of the ids and expiry times in _seen, kept up to date on add and evict
+        self._entry_bytes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self.lookups = 0
+        self.hits = 0
+
+        if db_path:
+            self._open_db()
+
+        metrics.register_gauge("dedup.hit_rate", self.hit_rate)
+        metrics.register_gauge("dedup.entries", lambda: len(self._seen))
+        metrics.register_gauge("dedup.memory_bytes", self.memory_bytes)
+
+    def seen(self, message_id: Optional[str]) -> bool:
+        """Record message_id and return True if it was already recorded"""
+        if not message_id:
+            return False
+
+        now = time.time()
+        self.lookups += 1
+        self._evict_expired(now)
+
+        if message_id in self._seen:
+            self.hits += 1
+            metrics.incr("dedup.duplicates")
+            return True
+
+        expires_at = now + self.ttl_seconds
+        self._add(message_id, expires_at)
+        if len(self._seen) > self.max_entries:
+            self._pop_oldest()
+
+        if self._conn is not None:
+            self._persist(message_id, expires_at)
+
+        return False
+
+    def hit_rate(self) -> float:
+        return round(self.hits / self.lookups, 4) if self.lookups else 0.0
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._seen) + self._entry_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._seen),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate(),
+            "memory_bytes": self.memory_bytes(),
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _evict_expired(self, now: float):
+        # ids are inserted with a constant ttl, so the oldest entry expires first
+        while self._seen:
+            message_id, expires_at = next(iter(self._seen.items()))
+            if expires_at > now:
+                break
+            self._pop_oldest()
+
+    def _add(self, message_id: str, expires_at: float):
+        if message_id not in self._seen:
+            self._entry_bytes += sys.getsizeof(message_id) + sys.getsizeof(expires_at)
+        self._seen[message_id] = expires_at
+
+    def _pop_oldest(self):
+        message_id, expires_at = self._seen.popitem(last=False)
+        self._entry_bytes -= sys.getsizeof(message_id) + sys.getsizeof(expires_at)
+
+    def _open_db(self):
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS seen_messages (message_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+            self._conn.execute("DELETE FROM seen_messages WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+
+            rows = self._conn.execute(
+                "SELECT message_id, expires_at FROM seen_messages ORDER BY expires_at DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+            for message_id, expires_at in reversed(rows):
+                self._add(message_id, expires_at)
+        except Exception as e:
+            logger.error(f"Error opening dedup store {self.db_path}: {e}")
+            self._conn = None
+
+    def _persist(self, message_id: str, expires_at: float):
+        try:
+            self._conn.execute("INSERT OR REPLACE INTO seen_messages (message_id, expires_at) VALUES (?, ?)", (message_id, expires_at))
+            self._conn.commit()
+        except Exception as e:
+            logger.error(f"Error persisting message id {message_id}: {e}")
+
+
+seen_messages = SeenMessageIndex(
+    ttl_seconds=settings.DEDUP_TTL_SECONDS,
+    max_entries=settings.DEDUP_MAX_ENTRIES,
+    db_path=settings.DEDUP_DB_PATH
+)
@@ -0,0 +1,214 @@
+import asyncio
+import time
+import traceback
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+from app.models.models import Message
+from app.utils.logger import setup_logger
+from app.utils.metrics import metrics
+
+logger = setup_logger("dispatcher", "dispatcher.log")
+
+
+class MessageDispatcher:
+    """Runs inbound messages through one ordered queue per phone number.
+
+    A phone is only ever held by one worker at a time, so turns for the same
+    conversation run strictly in arrival order, while the bounded worker pool
+    lets different phones progress concurrently.
+
+    With a coalesce window, consecutive text messages from one phone are held
+    until the sender pauses (or coalesce_max_wait passes) and then run as a
+    single turn with their texts joined.
+    """
+
+    def __init__(self, handler: Callable[[Message], Awaitable[Any]], workers: int = 8,
+                 coalesce_window: float = 0.0, coalesce_max_wait: float = 5.0):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.coalesce_window = coalesce_window
+        self.coalesce_max_wait = coalesce_max_wait
+        self._queues: Dict[str, Deque[Tuple[float, Message]]] = {}
+        self._scheduled: Set[str] = set()
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._last_enqueued: Dict[str, float] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+        self._busy_workers = 0
+        self._busy_seconds = 0.0
+        self._started_at: Optional[float] = None
+
+        metrics.register_gauge("dispatcher.queue_depth", self.queue_depth)
+        metrics.register_gauge("dispatcher.active_phones", lambda: len(self._scheduled))
+        metrics.register_gauge("dispatcher.busy_workers", lambda: self._busy_workers)
+        metrics.register_gauge("dispatcher.utilisation", self.utilisation)
+
+    async def start(self):
+        if self._tasks:
+            return
+
+        self._ready = asyncio.Queue()
+        self._started_at = time.monotonic()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        # phones submitted before start were queued without a ready queue
+        for phone in self._scheduled:
+            self._ready.put_nowait(phone)
+        logger.info(f"Dispatcher started with {self.workers} workers")
+
+    async def stop(self, timeout: float = 10.0):
+        if not self._tasks:
+            return
+
+        try:
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dispatcher stopped with {self.queue_depth()} messages still queued")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, message: Message):
+        """Queue a message for its phone; never blocks and never drops"""
+        phone = message.phone_number
+        now = time.monotonic()
+        self._queues.setdefault(phone, deque()).append((now, message))
+        self._last_enqueued[phone] = now
+        metrics.incr("dispatcher.submitted")
+
+        if not self._tasks:
+            asyncio.get_running_loop().create_task(self.start())
+
+        if self._can_coalesce(message):
+            self._arm_timer(phone)
+        else:
+            self._cancel_timer(phone)
+            self._schedule(phone)
+
+    def queue_depth(self, phone: Optional[str] = None) -> int:
+        if phone is not None:
+            return len(self._queues.get(phone, ()))
+        return sum(len(q) for q in self._queues.values())
+
+    def utilisation(self) -> float:
+        if not self._started_at:
+            return 0.0
+        elapsed = time.monotonic() - self._started_at
+        if elapsed <= 0:
+            return 0.0
+        return round(self._busy_seconds / (elapsed * self.workers), 4)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "busy_workers": self._busy_workers,
+            "queue_depth": self.queue_depth(),
+            "active_phones": len(self._scheduled),
+            "utilisation": self.utilisation(),
+            "wait_ms_p50": metrics.percentile("dispatcher.wait_ms", 50),
+            "wait_ms_p95": metrics.percentile("dispatcher.wait_ms", 95),
+        }
+
+    async def _drain(self):
+        while self._scheduled or self._timers:
+            await asyncio.sleep(0.05)
+
+    def _schedule(self, phone: str):
+        if phone in self._scheduled:
+            return
+        self._scheduled.add(phone)
+        if self._ready is not None:
+            self._ready.put_nowait(phone)
+
+    def _can_coalesce(self, message: Message) -> bool:
+        return self.coalesce_window > 0 and message.type == "text"
+
+    def _debounce_delay(self, phone: str) -> float:
+        """Seconds left before a phone's buffered texts should run"""
+        queue = self._queues.get(phone)
+        if not queue:
+            return 0.0
+        now = time.monotonic()
+        quiet_at = self._last_enqueued.get(phone, now) + self.coalesce_window
+        deadline = queue[0][0] + self.coalesce_max_wait
+        return max(0.0, min(quiet_at, deadline) - now)
+
+    def _arm_timer(self, phone: str):
+        # a worker already holding the phone re-checks the window when it finishes
+        if phone in self._scheduled:
+            return
+        self._cancel_timer(phone)
+        loop = asyncio.get_running_loop()
+        self._timers[phone] = loop.call_later(self._debounce_delay(phone), self._on_timer, phone)
+
+    def _cancel_timer(self, phone: str):
+        timer = self._timers.pop(phone, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _on_timer(self, phone: str):
+        self._timers.pop(phone, None)
+        self._schedule(phone)
+
+    def _coalesce(self, queue: Deque[Tuple[float, Message]], message: Message) -> Message:
+        if not self._can_coalesce(message):
+            return message
+
+        merged = [message]
+        while queue and self._can_coalesce(queue[0][1]):
+            merged.append(queue.popleft()[1])
+
+        if len(merged) == 1:
+            return message
+
+        metrics.incr("dispatcher.coalesced", len(merged) - 1)
+        return merged[-1].model_copy(update={
+            "content": "\n".join(str(m.content) for m in merged)
+        })
+
+    async def _worker(self, index: int):
+        while True:
+            phone = await self._ready.get()
+            try:
+                await self._run_next(phone)
+            finally:
+                self._ready.task_done()
+
+    async def _run_next(self, phone: str):
+        queue = self._queues.get(phone)
+        if not queue:
+            self._scheduled.discard(phone)
+            self._queues.pop(phone, None)
+            self._last_enqueued.pop(phone, None)
+            return
+
+        enqueued_at, message = queue.popleft()
+        message = self._coalesce(queue, message)
+        started = time.monotonic()
+        metrics.observe("dispatcher.wait_ms", (started - enqueued_at) * 1000)
+
+        self._busy_workers += 1
+        try:
+            await self.handler(message)
+            metrics.incr("dispatcher.processed")
+        except Exception as e:
+            metrics.incr("dispatcher.failed")
+            logger.error(f"Error processing message {message.message_id} for {phone}: {e}")
+            traceback.print_exc()
+        finally:
+            self._busy_workers -= 1
+            elapsed = time.monotonic() - started
+            self._busy_seconds += elapsed
+            metrics.observe("dispatcher.turn_ms", elapsed * 1000)
+
+        # requeue at the tail so one chatty phone cannot starve the others
+        if not queue:
+            self._scheduled.discard(phone)
+            self._queues.pop(phone, None)
+            self._last_enqueued.pop(phone, None)
+        elif self._can_coalesce(queue[-1][1]) and self._debounce_delay(phone) > 0:
+            self._scheduled.discard(phone)
+            self._arm_timer(phone)
+        else:
+            self._ready.put_nowait(phone)
@@ -0,0 +1,128 @@
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+from app.utils.metrics import metrics
+
+# list_reply ids of main_menu_options
+MENU_INTENTS = {
+    "CREATE_APPOINTMENT": "create_appointment",
+    "CHECK_APPOINTMENT_STATUS": "check_appointment_status",
+    "UPDATE_APPOINTMENT": "edit_appointment",
+    "CANCEL_APPOINTMENT": "cancel_appointment",
+}
+# intents a mid-flow reply can continue without asking the LLM again
+FLOW_INTENTS = {"create_appointment", "edit_appointment", "cancel_appointment", "check_appointment_status"}
+
+YES_WORDS = {"yes", "y", "yeah", "yep", "ok", "okay", "confirm", "confirmed", "correct", "si", "claro", "confirmo", "correcto", "de acuerdo", "va"}
+NO_WORDS = {"no", "nope", "n", "abort"}
+# abort a pending confirmation, otherwise ask to cancel an appointment
+CANCEL_WORDS = {"cancel", "cancelar", "cancela"}
+ACCEPT_WORDS = YES_WORDS | {"accept", "acepto", "aceptar"}
+DECLINE_WORDS = {"no", "nope", "n", "decline", "reject", "rechazo", "rechazar"}
+
+BOOKING_CODE = re.compile(r"^IVX[A-Z0-9]{6}$")
+DATE_ID = re.compile(r"^(20\d{2})(0[1-9]|1[0-2])(0[1-9]|[12]\d|3[01])$")
+TIME_ID = re.compile(r"^([01]\d|2[0-3])([0-5]\d)$")
+
+
+def _normalise(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.strip().lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return text.strip(" .!¡?¿")
+
+
+def _record(rule: Optional[str]):
+    if rule:
+        metrics.incr("fast_path.hits")
+        metrics.incr(f"fast_path.rule.{rule}")
+    else:
+        metrics.incr("fast_path.misses")
+
+
+def hit_ratio() -> float:
+    hits = metrics.counters.get("fast_path.hits", 0)
+    total = hits + metrics.counters.get("fast_path.misses", 0)
+    return hits / total if total else 0.0
+
+
+metrics.register_gauge("fast_path.hit_ratio", hit_ratio)
+
+
+def route(text: Any, state: Dict[str, Any], entity_keys: List[str], interactive: bool = False) -> Optional[Dict[str, Any]]:
+    """Resolve interactive ids and obvious replies without the LLM.
+
+    List and button ids are only recognised when interactive is set (the
+    message was a list/button reply): typed text such as "2030" or
+    "20261024" is an ordinary message. Returns a result shaped like
+    agents.analyze_turn, or None when no rule matches and the turn has to
+    be analysed by the model.
+    """
+    if not isinstance(text, str) or not text.strip():
+        _record(None)
+        return None
+
+    raw = text.strip()
+    upper = raw.upper()
+    word = _normalise(raw)
+    entities: Dict[str, Optional[str]] = {key: None for key in entity_keys}
+    intent = None
+    confirmation_intent = "OTHER"
+    booking_code = None
+    rule = None
+
+    if interactive and upper in MENU_INTENTS:
+        intent, rule = MENU_INTENTS[upper], "menu"
+    elif interactive and upper == "CONFIRM_ALL":
+        confirmation_intent, rule = "CONFIRM", "confirm_all"
+    elif interactive and upper.startswith("UPDATE_"):
+        confirmation_intent, rule = "CHANGE_REQUEST", "update_field"
+    elif interactive and DATE_ID.match(raw):
+        year, month, day = DATE_ID.match(raw).groups()
+        entities["date"] = f"{year}-{month}-{day}"
+        confirmation_intent, rule = "CHANGE_REQUEST", "date_id"
+    elif interactive and TIME_ID.match(raw):
+        hour, minute = TIME_ID.match(raw).groups()
+        entities["time"] = f"{hour}:{minute}"
+        confirmation_intent, rule = "CHANGE_REQUEST", "time_id"
+    elif BOOKING_CODE.match(upper):
+        booking_code, rule = upper, "booking_code"
+    elif word in YES_WORDS:
+        confirmation_intent, rule = "CONFIRM", "yes"
+    elif word in NO_WORDS:
+        confirmation_intent, rule = "ABORT", "no"
+    elif word in CANCEL_WORDS and state.get("confirmation_status") == "PENDING":
+        confirmation_intent, rule = "ABORT", "cancel_pending"
+    elif word in CANCEL_WORDS:
+        intent, rule = "cancel_appointment", "cancel"
+
+    if rule is None:
+        _record(None)
+        return None
+
+    if intent is None:
+        # a bare reply only makes sense as the next step of the flow in progress
+        intent = state.get("intent")
+        if intent not in FLOW_INTENTS:
+            _record(None)
+            return None
+
+    _record(rule)
+    return {
+        "intent": intent,
+        "confirmation_intent": confirmation_intent,
+        "booking_code": booking_code,
+        "entities": entities,
+        "source": "fast_path",
+    }
+
+
+def route_doctor_reply(text: Any) -> Optional[str]:
+    """accept/decline for a doctor's answer to an invite, None if not obvious"""
+    if not isinstance(text, str):
+        _record(None)
+        return None
+
+    word = _normalise(text)
+    intent = "accept" if word in ACCEPT_WORDS else "decline" if word in DECLINE_WORDS else None
+    _record(intent and f"doctor_{intent}")
+    return intent
@@ -0,0 +1,32 @@
+from typing import Any, Callable, Dict
+from langchain_core.runnables import RunnableConfig # type: ignore
+
+# key in config["configurable"] holding the per-turn assistant
+ASSISTANT_KEY = "assistant"
+
+
+def turn_config(assistant: Any, session_id: str) -> Dict[str, Any]:
+    """Config for one run of a process-wide compiled graph"""
+    return {"configurable": {"session_id": session_id, ASSISTANT_KEY: assistant}}
+
+
+def node(name: str) -> Callable:
+    """Graph node delegating to the method of that name on this turn's assistant.
+
+    Graphs are compiled once per process; the assistant carrying the
+    message, services and state of the turn arrives through the run config.
+    """
+    async def run(state: Dict[str, Any], config: RunnableConfig):
+        return await getattr(config["configurable"][ASSISTANT_KEY], name)(state)
+
+    run.__name__ = name
+    return run
+
+
+def route(name: str) -> Callable:
+    """Conditional edge delegating to the routing method of that name on this turn's assistant"""
+    def run(state: Dict[str, Any], config: RunnableConfig) -> str:
+        return getattr(config["configurable"][ASSISTANT_KEY], name)(state)
+
+    run.__name__ = name
+    return run
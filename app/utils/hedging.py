@@ -0,0 +1,126 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from app.core.config import settings
+from app.utils.metrics import metrics
+from app.utils.rate_limiter import openai_limiter
+
+# one attempt at an LLM call; True asks for the fallback model/provider
+Attempt = Callable[[bool], Awaitable[Any]]
+
+
+class HedgeBudget:
+    """Caps hedges at a share of calls: every call adds ratio, every hedge takes one.
+
+    The balance tops out at burst, so a quiet spell cannot save up for a
+    run of hedges when the API slows down for everyone.
+    """
+
+    def __init__(self):
+        self.balance = 0.0
+
+    def deposit(self, ratio: float, burst: float):
+        self.balance = min(burst, self.balance + ratio)
+
+    def withdraw(self) -> bool:
+        if self.balance < 1:
+            return False
+        self.balance -= 1
+        return True
+
+
+_budgets: Dict[str, HedgeBudget] = {}
+
+
+def deadline_for(call_site: str) -> float:
+    return settings.LLM_DEADLINES.get(call_site, settings.LLM_DEFAULT_DEADLINE_SECONDS)
+
+
+def hedge_delay(call_site: str) -> Optional[float]:
+    """Seconds after which call_site is hedged: the LLM_HEDGE_PERCENTILE of its attempt latency.
+
+    None when the call site is not hedged or has too few samples yet.
+    """
+    if call_site not in settings.LLM_HEDGE_CALL_SITES:
+        return None
+    name = f"llm.{call_site}.attempt_ms"
+    if metrics.sample_count(name) < settings.LLM_HEDGE_MIN_SAMPLES:
+        return None
+    return metrics.percentile(name, settings.LLM_HEDGE_PERCENTILE) / 1000
+
+
+async def _timed(call_site: str, attempt: Attempt, hedge: bool = False) -> Any:
+    """attempt(False), sampled into the attempt latency however it ends.
+
+    Failed attempts count at the time they took, and a cancelled primary
+    (hedge won, deadline hit) at the time it had run, a lower bound that
+    still lands in the tail. A cancelled hedge is left out: it started
+    late and only lost to the primary, so its time says nothing.
+    """
+    started = time.perf_counter()
+    cancelled = False
+    try:
+        return await attempt(False)
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+    finally:
+        if not (cancelled and hedge):
+            metrics.observe(f"llm.{call_site}.attempt_ms", (time.perf_counter() - started) * 1000)
+
+
+def _may_hedge(call_site: str) -> bool:
+    # a hedge would only queue behind the calls already waiting for the limiter
+    if openai_limiter.queued:
+        return False
+    if not _budgets[call_site].withdraw():
+        metrics.incr(f"llm.{call_site}.hedges_denied")
+        return False
+    return True
+
+
+async def _race(call_site: str, attempt: Attempt) -> Any:
+    primary = asyncio.create_task(_timed(call_site, attempt))
+    pending: Set[asyncio.Task] = {primary}
+    try:
+        delay = hedge_delay(call_site)
+        if delay is not None:
+            _budgets.setdefault(call_site, HedgeBudget()).deposit(settings.LLM_HEDGE_MAX_RATIO, settings.LLM_HEDGE_BURST)
+        if delay is not None and not (await asyncio.wait(pending, timeout=delay))[0] and _may_hedge(call_site):
+            metrics.incr(f"llm.{call_site}.hedges")
+            pending.add(asyncio.create_task(_timed(call_site, attempt, hedge=True)))
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        metrics.incr(f"llm.{call_site}.hedge_wins")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def hedged_call(call_site: str, attempt: Attempt) -> Any:
+    """Run attempt within call_site's deadline, hedging it and falling back as configured.
+
+    For call sites in LLM_HEDGE_CALL_SITES, a second attempt starts once
+    the first has run longer than hedge_delay, budget permitting (at most
+    LLM_HEDGE_MAX_RATIO of calls); the first to succeed wins and the other
+    is cancelled. If no attempt succeeds by the deadline and
+    LLM_FALLBACK_MODEL is set, one attempt on the fallback gets
+    LLM_FALLBACK_DEADLINE_SECONDS of its own; otherwise TimeoutError is raised.
+    """
+    try:
+        return await asyncio.wait_for(_race(call_site, attempt), deadline_for(call_site))
+    except asyncio.TimeoutError:
+        metrics.incr(f"llm.{call_site}.deadline_missed")
+        if not settings.LLM_FALLBACK_MODEL:
+            raise
+
+    metrics.incr(f"llm.{call_site}.fallbacks")
+    return await asyncio.wait_for(attempt(True), settings.LLM_FALLBACK_DEADLINE_SECONDS)
@@ -1,17 +1,36 @@
 from datetime import datetime, timedelta
 import re
-from typing import Dict
+import time
+from functools import lru_cache
+from typing import Optional, Sequence
+from app.core.config import settings
 from app.models.models import Message
+from app.services.openai import TRANSIENT_ERRORS, reserved_tokens
 from app.services.whatsapp import WhatsAppBusinessAPI
+from app.utils.hedging import hedged_call
+from app.utils.history_store import WindowedHistory, history_store
+from app.utils.llm_cache import cached_call
+from app.utils.metrics import count_llm_call
+from app.utils.model_routing import Route, route_for
+from app.utils.rate_limiter import openai_limiter, priority_for
 from app.utils.state_manager import StateManager
-from langchain_core.runnables.history import RunnableWithMessageHistory # type: ignore
-from langchain_community.chat_message_histories import ChatMessageHistory # type: ignore
+from app.utils.token_budget import budget_for, fit_history, record_usage
+from app.utils.tokens import count_message_tokens, count_tokens
+from langchain_core.messages import BaseMessage # type: ignore
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder # type: ignore
 from langchain_openai import ChatOpenAI # type: ignore
 import os
 from dateutil import parser # type: ignore
 
-llm = ChatOpenAI(api_key=os.getenv("OPENAI_API_KEY"), model="gpt-3.5-turbo", temperature=0.7)
+@lru_cache(maxsize=32)
+def chat_model(route: Route, base_url: Optional[str] = None, api_key: Optional[str] = None) -> ChatOpenAI:
+    """Shared chat model for a route; retries are left to openai_limiter (see complete_reply)"""
+    return ChatOpenAI(
+        api_key=api_key or os.getenv("OPENAI_API_KEY"), base_url=base_url, model=route.model,
+        temperature=route.temperature, max_tokens=route.max_tokens, max_retries=0
+    )
+
+llm = chat_model(route_for("reply"))
 language = "spanish"
 
 # response_prompt = ChatPromptTemplate.from_messages(
@@ -30,33 +49,51 @@ response_prompt = ChatPromptTemplate.from_messages(
 )
 response_chain = response_prompt | llm
 
-response_history: Dict[str, ChatMessageHistory] = {}
-
-def get_message_history(clinic_phone: str) -> ChatMessageHistory:
-    if clinic_phone not in response_history:
-        response_history[clinic_phone] = ChatMessageHistory()
-        print(f"Initialized new history for {clinic_phone}")
-
-    full_history = response_history[clinic_phone]
-    limited_history = ChatMessageHistory()
-    messages = full_history.messages[-5:] if len(full_history.messages) > 5 else full_history.messages
-    for message in messages:
-        limited_history.add_message(message)
-
-    return limited_history
-
-def get_response_runnable(clinic_phone: str) -> RunnableWithMessageHistory:
-    return RunnableWithMessageHistory(
-        runnable=response_chain,
-        get_session_history=lambda session_id: get_message_history(session_id),
-        input_messages_key="input",
-        history_messages_key="chat_history",
+def get_message_history(clinic_phone: str) -> WindowedHistory:
+    return history_store.view(clinic_phone)
+
+async def complete_reply(call_site: str, input_text: str, history: Sequence[BaseMessage]) -> BaseMessage:
+    """Run response_prompt with as much recent history as fits the call site's token budget.
+
+    The model, temperature and max_tokens come from the call site's route.
+    Like every chat_completion, the call is queued on openai_limiter and
+    bounded by the call site's deadline, with hedging and the fallback model.
+    """
+    route = route_for(call_site)
+    budget = budget_for(call_site)
+    fixed = response_prompt.format_messages(input=input_text, chat_history=[])
+    chat_history = fit_history(fixed, history, budget, route.model)
+    messages = response_prompt.format_messages(input=input_text, chat_history=chat_history)
+
+    def attempt(fallback: bool):
+        if fallback:
+            model = chat_model(route._replace(model=settings.LLM_FALLBACK_MODEL),
+                               settings.LLM_FALLBACK_BASE_URL, settings.LLM_FALLBACK_API_KEY)
+            priority = 0
+        else:
+            model, priority = chat_model(route), priority_for(call_site)
+        return openai_limiter.call(
+            lambda: model.ainvoke(messages), reserved_tokens(messages, model.model_name, model.max_tokens),
+            priority, usage=lambda response: (response.usage_metadata or {}).get("total_tokens"),
+            retry_on=TRANSIENT_ERRORS
+        )
+
+    started = time.perf_counter()
+    response = await hedged_call(call_site, attempt)
+    usage = getattr(response, "usage_metadata", None) or {}
+    record_usage(
+        call_site, usage.get("input_tokens") or count_message_tokens(messages, route.model),
+        usage.get("output_tokens", 0), (time.perf_counter() - started) * 1000, budget
     )
+    return response
+
+def tokens_used(response, prompt: str, model: str) -> int:
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("total_tokens") or count_tokens(prompt, model) + count_tokens(response.content, model)
 
-async def invoke_ai(prompt:str, clinic_phone:str):
-    runnable = get_response_runnable(clinic_phone)
+async def invoke_ai(prompt:str, clinic_phone:str, call_site: str = "reply"):
     history = get_message_history(clinic_phone)
-    history.add_user_message(prompt)
+    model = route_for(call_site).model
 
     state = StateManager().get_state(clinic_phone)
     language = "spanish"
@@ -100,16 +137,16 @@ async def invoke_ai(prompt:str, clinic_phone:str):
     # "history": history.messages
     # }
 
-    response = await runnable.ainvoke(
-        input_data,
-        config={"configurable": {"session_id": clinic_phone}}
-    )
-    return response.content
+    async def call():
+        count_llm_call()
+        response = await complete_reply(call_site, input_data["input"], history.messages)
+        return response.content, tokens_used(response, prompt, model)
 
-async def invoke_doctor_ai(prompt:str, clinic_phone:str):
-    runnable = get_response_runnable(clinic_phone)
+    return await cached_call(call_site, prompt, model, call, language=language, phone=clinic_phone)
+
+async def invoke_doctor_ai(prompt:str, clinic_phone:str, call_site: str = "doctor_reply"):
     history = get_message_history(clinic_phone)
-    history.add_user_message(prompt)
+    model = route_for(call_site).model
 
     state = StateManager().get_state(clinic_phone)
     language = "spanish"
@@ -147,11 +184,12 @@ async def invoke_doctor_ai(prompt:str, clinic_phone:str):
 
     input_data= input_data_sp if language.lower() == "spanish" else input_data_en
 
-    response = await runnable.ainvoke(
-        input_data,
-        config={"configurable": {"session_id": clinic_phone}}
-    )
-    return response.content
+    async def call():
+        count_llm_call()
+        response = await complete_reply(call_site, input_data["input"], history.messages)
+        return response.content, tokens_used(response, prompt, model)
+
+    return await cached_call(call_site, prompt, model, call, language=language, phone=clinic_phone)
 
 async def send_response(clinic_phone: str, response_message: str, message: Message):
     history = get_message_history(clinic_phone)
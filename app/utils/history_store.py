@@ -0,0 +1,241 @@
+import asyncio
+import contextvars
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Set
+from langchain_core.chat_history import BaseChatMessageHistory # type: ignore
+from langchain_core.messages import BaseMessage, SystemMessage, messages_from_dict, messages_to_dict # type: ignore
+from app.agents import agents
+from app.core.config import settings
+from app.utils.logger import setup_logger
+from app.utils.metrics import metrics
+from app.utils.state_store import SqliteStateStore, StateStore
+from app.utils.tokens import count_message_tokens
+
+logger = setup_logger("history_store", "history_store.log")
+
+# bound the work one access can spend evicting idle conversations
+MAX_EVICTIONS_PER_ACCESS = 100
+# the token budget never trims the window below the latest exchange
+MIN_RECENT_MESSAGES = 2
+MAX_PENDING_MESSAGES = 50
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+# (current summary, transcript of messages to fold in) -> new summary, or None on failure
+Summarizer = Callable[[str, str], Awaitable[Optional[str]]]
+
+
+class Conversation:
+    __slots__ = ("messages", "summary", "pending", "summarizing")
+
+    def __init__(self, messages: List[BaseMessage], summary: str = "", pending: Optional[List[BaseMessage]] = None):
+        self.messages: Deque[BaseMessage] = deque(messages)
+        self.summary = summary
+        # messages pushed out of the window, waiting to be folded into the summary
+        self.pending: List[BaseMessage] = pending or []
+        self.summarizing = False
+
+
+class HistoryStore:
+    """The recent chat messages per phone in a ring buffer, plus a rolling summary of older ones.
+
+    The window holds at most `window` messages and, beyond the last
+    MIN_RECENT_MESSAGES, at most token_budget tokens. Messages pushed out
+    are folded into the conversation's summary by `summarizer` in a
+    background task, so the prompt stays roughly the same size however long
+    the conversation runs; without a summarizer they are dropped.
+
+    Conversations are kept resident in LRU order and dropped once idle for
+    idle_ttl seconds or when more than max_resident are held. With a
+    backing store every change is written through, so dropped and
+    pre-restart conversations are reloaded on next use; without one an
+    evicted conversation starts over.
+    """
+
+    def __init__(self, window: int, idle_ttl: float, max_resident: int, store: Optional[StateStore] = None,
+                 token_budget: Optional[int] = None, summarizer: Optional[Summarizer] = None):
+        self.window = window
+        self.idle_ttl = idle_ttl
+        self.max_resident = max_resident
+        self.store = store
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.evictions = 0
+        self._tasks: Set[asyncio.Task] = set()
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._accessed: Dict[str, float] = {}
+
+        metrics.register_gauge("history.resident", lambda: len(self._conversations))
+        metrics.register_gauge("history.evictions", lambda: self.evictions)
+
+    def _conversation(self, phone: str) -> Conversation:
+        conversation = self._conversations.get(phone)
+        if conversation is None:
+            conversation = self._load(phone)
+            self._conversations[phone] = conversation
+
+        now = time.time()
+        self._conversations.move_to_end(phone)
+        self._accessed[phone] = now
+        self._evict(now)
+        return conversation
+
+    def _load(self, phone: str) -> Conversation:
+        record = self.store.load(phone) if self.store is not None else None
+        if not record:
+            return Conversation([])
+        try:
+            return Conversation(
+                messages_from_dict(record.get("messages", [])), record.get("summary", ""),
+                messages_from_dict(record.get("pending", []))
+            )
+        except Exception as e:
+            logger.error(f"Error loading history for {phone}: {e}")
+            return Conversation([])
+
+    def _save(self, phone: str, conversation: Conversation):
+        if self.store is not None:
+            self.store.save(phone, {
+                "messages": messages_to_dict(list(conversation.messages)),
+                "summary": conversation.summary,
+                "pending": messages_to_dict(conversation.pending),
+            })
+
+    def _evict(self, now: float):
+        evicted = 0
+        while len(self._conversations) > 1 and evicted < MAX_EVICTIONS_PER_ACCESS:
+            oldest = next(iter(self._conversations))
+            over_cap = len(self._conversations) > self.max_resident
+            idle = now - self._accessed.get(oldest, now) > self.idle_ttl
+            if not (over_cap or idle):
+                break
+            self._conversations.pop(oldest)
+            self._accessed.pop(oldest, None)
+            self.evictions += 1
+            evicted += 1
+
+    def messages(self, phone: str) -> List[BaseMessage]:
+        """The summary (as a system message) and the window, oldest first.
+
+        The list holds the buffered messages themselves, not copies.
+        """
+        conversation = self._conversation(phone)
+        if conversation.summary:
+            return [SystemMessage(content=f"{SUMMARY_PREFIX}{conversation.summary}"), *conversation.messages]
+        return list(conversation.messages)
+
+    def add_messages(self, phone: str, messages: Sequence[BaseMessage]):
+        conversation = self._conversation(phone)
+        conversation.messages.extend(messages)
+        self._trim(conversation)
+        self._save(phone, conversation)
+        if conversation.pending:
+            self._schedule_summary(phone, conversation)
+
+    def _trim(self, conversation: Conversation):
+        buffer = conversation.messages
+        tokens = count_message_tokens(buffer)
+        while len(buffer) > self.window or (
+            self.token_budget and len(buffer) > MIN_RECENT_MESSAGES and tokens > self.token_budget
+        ):
+            message = buffer.popleft()
+            tokens -= count_message_tokens([message])
+            if self.summarizer is not None:
+                conversation.pending.append(message)
+        metrics.observe("history.window_tokens", tokens)
+        # a summarizer that keeps failing must not let the backlog grow without bound
+        del conversation.pending[:-MAX_PENDING_MESSAGES]
+
+    def _schedule_summary(self, phone: str, conversation: Conversation):
+        if conversation.summarizing:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # no loop (e.g. a script); the backlog is folded on the next async append
+            return
+        conversation.summarizing = True
+        # fresh context: the summary is not part of the turn that triggered it
+        task = loop.create_task(self._summarize(phone, conversation), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, phone: str, conversation: Conversation):
+        try:
+            while conversation.pending:
+                batch = list(conversation.pending)
+                transcript = "\n".join(f"{message.type}: {message.content}" for message in batch)
+                started = time.perf_counter()
+                summary = await self.summarizer(conversation.summary, transcript)
+                metrics.observe("history.summary_ms", (time.perf_counter() - started) * 1000)
+                if summary is None:
+                    metrics.incr("history.summary_failures")
+                    return
+                if self._conversations.get(phone) is not conversation:
+                    # evicted meanwhile: the store still has the backlog, and saving
+                    # this copy could overwrite turns added after a reload
+                    metrics.incr("history.summaries_dropped")
+                    return
+
+                conversation.summary = summary
+                # by identity: the MAX_PENDING_MESSAGES cap may have dropped part of the batch
+                folded = {id(message) for message in batch}
+                conversation.pending[:] = [message for message in conversation.pending if id(message) not in folded]
+                metrics.incr("history.summaries")
+                self._save(phone, conversation)
+        except Exception as e:
+            logger.error(f"Error summarising history for {phone}: {e}")
+        finally:
+            conversation.summarizing = False
+
+    def clear(self, phone: str):
+        conversation = self._conversation(phone)
+        conversation.messages.clear()
+        conversation.pending.clear()
+        conversation.summary = ""
+        if self.store is not None:
+            self.store.delete(phone)
+
+    def view(self, phone: str, read_only: bool = False) -> "WindowedHistory":
+        return WindowedHistory(self, phone, read_only)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+class WindowedHistory(BaseChatMessageHistory):
+    """ChatMessageHistory-compatible handle on one phone's buffer in the HistoryStore.
+
+    Read-only views drop writes, for callers that must not record their
+    inputs (internal instructions rather than the conversation).
+    """
+
+    def __init__(self, store: HistoryStore, phone: str, read_only: bool = False):
+        self.store = store
+        self.phone = phone
+        self.read_only = read_only
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return self.store.messages(self.phone)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        if not self.read_only:
+            self.store.add_messages(self.phone, messages)
+
+    def clear(self) -> None:
+        if not self.read_only:
+            self.store.clear(self.phone)
+
+
+def create_history_store() -> HistoryStore:
+    store = SqliteStateStore(settings.HISTORY_DB_PATH, "chat_history") if settings.HISTORY_DB_PATH else None
+    summarizer = agents.summarize_history if settings.HISTORY_SUMMARY_ENABLED else None
+    return HistoryStore(
+        settings.HISTORY_WINDOW, settings.HISTORY_IDLE_TTL_SECONDS, settings.HISTORY_MAX_RESIDENT, store,
+        token_budget=settings.HISTORY_TOKEN_BUDGET, summarizer=summarizer
+    )
+
+
+history_store = create_history_store()
@@ -0,0 +1,288 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np # type: ignore
+from app.core.config import settings
+from app.utils.logger import setup_logger
+from app.utils.metrics import metrics
+
+logger = setup_logger("intent_model", "intent_model.log")
+
+CLINIC_INTENTS = [
+    "create_appointment", "edit_appointment", "cancel_appointment", "check_appointment_status",
+    "language_english", "language_spanish", "greet", "other"
+]
+DOCTOR_INTENTS = ["accept", "decline", "other"]
+
+_log_lock = threading.Lock()
+
+
+def _normalise(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).split())
+
+
+def featurize(text: str, dim: int, ngram_range: Tuple[int, int] = (2, 4)) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashed character n-grams and words as an L2-normalised sparse vector (indices, values).
+
+    Accents are stripped so English and Spanish spellings with or without
+    diacritics land in the same buckets; crc32 keeps the hashing stable
+    across processes.
+    """
+    text = _normalise(text)
+    padded = f" {text} "
+    counts: Dict[int, float] = {}
+
+    grams = [f"w:{word}" for word in text.split()]
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+    for gram in grams:
+        index = zlib.crc32(gram.encode("utf-8")) % dim
+        counts[index] = counts.get(index, 0.0) + 1.0
+
+    if not counts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    return indices, values / np.linalg.norm(values)
+
+
+class IntentModel:
+    """Multinomial logistic regression over hashed n-gram features"""
+
+    def __init__(self, labels: Sequence[str], weights: np.ndarray, bias: np.ndarray,
+                 dim: int, ngram_range: Tuple[int, int] = (2, 4)):
+        self.labels = list(labels)
+        self.weights = weights
+        self.bias = bias
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def probabilities(self, text: str) -> np.ndarray:
+        indices, values = featurize(text, self.dim, self.ngram_range)
+        return _softmax(values @ self.weights[indices] + self.bias)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        probabilities = self.probabilities(text)
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path, labels=np.array(self.labels), weights=self.weights, bias=self.bias,
+            dim=self.dim, ngram_range=np.array(self.ngram_range)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        with np.load(path) as data:
+            return cls(
+                [str(label) for label in data["labels"]], data["weights"], data["bias"],
+                int(data["dim"]), tuple(int(n) for n in data["ngram_range"])
+            )
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    exp = np.exp(scores - scores.max())
+    return exp / exp.sum()
+
+
+def train(texts: Sequence[str], targets: Sequence[str], labels: Sequence[str], dim: int = 2 ** 14,
+          epochs: int = 20, learning_rate: float = 0.5, l2: float = 1e-5, seed: int = 0) -> IntentModel:
+    """Fit the model with plain SGD; fast enough offline for tens of thousands of samples"""
+    label_index = {label: i for i, label in enumerate(labels)}
+    features = [featurize(text, dim) for text in texts]
+    y = np.array([label_index[target] for target in targets])
+
+    weights = np.zeros((dim, len(labels)), dtype=np.float32)
+    bias = np.zeros(len(labels), dtype=np.float32)
+    rng = np.random.default_rng(seed)
+
+    for epoch in range(epochs):
+        rate = learning_rate / (1 + epoch)
+        for i in rng.permutation(len(features)):
+            indices, values = features[i]
+            gradient = _softmax(values @ weights[indices] + bias)
+            gradient[y[i]] -= 1.0
+            weights[indices] -= rate * (np.outer(values, gradient) + l2 * weights[indices])
+            bias -= rate * gradient
+
+    return IntentModel(labels, weights, bias, dim)
+
+
+def evaluate(model: IntentModel, texts: Sequence[str], targets: Sequence[str], threshold: float) -> Dict[str, float]:
+    """Accuracy overall and on the predictions confident enough to skip the LLM"""
+    correct = confident = confident_correct = 0
+    latencies = []
+    for text, target in zip(texts, targets):
+        started = time.perf_counter()
+        label, confidence = model.predict(text)
+        latencies.append((time.perf_counter() - started) * 1000)
+        correct += label == target
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += label == target
+
+    total = len(texts) or 1
+    latencies.sort()
+    return {
+        "accuracy": correct / total,
+        "escalation_rate": 1 - confident / total,
+        "local_accuracy": confident_correct / confident if confident else 0.0,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] if latencies else 0.0,
+    }
+
+
+class SampleLog:
+    """Append-only JSONL file written behind the callers' back.
+
+    append() only queues the line; a writer thread appends whatever has
+    queued up, first rotating the file to <path>.1 once it has grown past
+    max_bytes, so at most about twice that is kept on disk.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._queue: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._write_lock = threading.Lock()
+        threading.Thread(target=self._write_loop, name=f"writer-{path}", daemon=True).start()
+        atexit.register(self.flush)
+
+    def append(self, line: str):
+        self._queue.put(line)
+
+    def _write_loop(self):
+        while True:
+            self._write([self._queue.get()])
+
+    def flush(self):
+        """Write whatever is queued; safe to call from any thread"""
+        self._write([])
+
+    def _write(self, lines: List[str]):
+        with self._write_lock:
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not lines:
+                return
+            try:
+                if self.max_bytes > 0 and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+                with open(self.path, "a") as f:
+                    f.writelines(lines)
+            except OSError as e:
+                logger.error(f"Error logging intent samples: {e}")
+
+
+_sample_logs: Dict[str, SampleLog] = {}
+
+
+def log_sample(kind: str, message: str, intent: str):
+    """Queue an LLM-labelled (message, intent) pair for the next training run"""
+    path = settings.INTENT_LOG_PATH
+    if not path or not isinstance(message, str) or not message.strip():
+        return
+    with _log_lock:
+        if path not in _sample_logs:
+            _sample_logs[path] = SampleLog(path, settings.INTENT_LOG_MAX_BYTES)
+    _sample_logs[path].append(json.dumps({"kind": kind, "message": message, "intent": intent}) + "\n")
+
+
+def load_samples(path: str, kind: str, labels: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """The labelled samples of kind in path and, if there is one, its rotated predecessor"""
+    allowed = set(labels)
+    texts, targets = [], []
+    for file in (f"{path}.1", path):
+        if file != path and not os.path.exists(file):
+            continue
+        with open(file) as f:
+            for line in f:
+                try:
+                    sample = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if sample.get("kind") == kind and sample.get("intent") in allowed:
+                    texts.append(sample["message"])
+                    targets.append(sample["intent"])
+    return texts, targets
+
+
+class IntentClassifier:
+    """Runtime wrapper: answers locally when confident, otherwise returns None to escalate"""
+
+    def __init__(self, kind: str, labels: Sequence[str], threshold: float):
+        self.kind = kind
+        self.labels = list(labels)
+        self.threshold = threshold
+        self.path = os.path.join(settings.INTENT_MODEL_DIR, f"{kind}.npz")
+        self._model: Optional[IntentModel] = None
+        self._loaded = False
+        metrics.register_gauge(f"intent_model.{kind}.escalation_rate", self.escalation_rate)
+        metrics.register_gauge(f"intent_model.{kind}.shadow_accuracy", self.shadow_accuracy)
+
+    @property
+    def model(self) -> Optional[IntentModel]:
+        if not self._loaded:
+            self._loaded = True
+            if os.path.exists(self.path):
+                try:
+                    self._model = IntentModel.load(self.path)
+                except Exception as e:
+                    logger.error(f"Error loading intent model {self.path}: {e}")
+        return self._model
+
+    def predict(self, text: str) -> Optional[Tuple[str, float]]:
+        if self.model is None or not isinstance(text, str) or not text.strip():
+            return None
+        started = time.perf_counter()
+        prediction = self.model.predict(text)
+        metrics.observe("intent_model.predict_ms", (time.perf_counter() - started) * 1000)
+        return prediction
+
+    def classify(self, text: str) -> Optional[str]:
+        """The local label if confidence clears the threshold, else None"""
+        prediction = self.predict(text)
+        if prediction is None:
+            return None
+
+        label, confidence = prediction
+        return label if confidence >= self.threshold else None
+
+    def record(self, used: bool):
+        """Count a turn as answered locally or escalated to the LLM, by whether classify's label was used"""
+        if self.model is not None:
+            metrics.incr(f"intent_model.{self.kind}.{'local' if used else 'escalated'}")
+
+    def shadow(self, text: str, llm_intent: str):
+        """Compare against the LLM's answer on escalated turns to track accuracy online"""
+        prediction = self.predict(text)
+        if prediction is not None:
+            metrics.incr(f"intent_model.{self.kind}.{'agree' if prediction[0] == llm_intent else 'disagree'}")
+        log_sample(self.kind, text, llm_intent)
+
+    def escalation_rate(self) -> float:
+        local = metrics.counters.get(f"intent_model.{self.kind}.local", 0)
+        escalated = metrics.counters.get(f"intent_model.{self.kind}.escalated", 0)
+        return escalated / (local + escalated) if local + escalated else 1.0
+
+    def shadow_accuracy(self) -> float:
+        agree = metrics.counters.get(f"intent_model.{self.kind}.agree", 0)
+        disagree = metrics.counters.get(f"intent_model.{self.kind}.disagree", 0)
+        return agree / (agree + disagree) if agree + disagree else 0.0
+
+
+clinic_intents = IntentClassifier("clinic", CLINIC_INTENTS, settings.INTENT_CONFIDENCE_THRESHOLD)
+doctor_intents = IntentClassifier("doctor", DOCTOR_INTENTS, settings.INTENT_CONFIDENCE_THRESHOLD)
@@ -0,0 +1,71 @@
+import hashlib
+import unicodedata
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from app.core.config import settings
+from app.utils.cache import MISS, create_cache
+from app.utils.metrics import metrics
+
+# what a cached response is shared across, besides the prompt and model
+SCOPES = ("global", "language", "phone")
+
+response_cache = create_cache("llm_responses", settings.LLM_CACHE_MAX_ENTRIES)
+
+
+def normalise_prompt(prompt: str) -> str:
+    """Whitespace and Unicode form only: case can carry meaning (names) in extracted values"""
+    return " ".join(unicodedata.normalize("NFC", prompt).split())
+
+
+def scope_for(call_site: str) -> Optional[str]:
+    """The configured scope of a call site, None if its responses are not cached"""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    scope = settings.LLM_CACHE_SCOPES.get(call_site)
+    return scope if scope in SCOPES else None
+
+
+def cache_key(scope: str, prompt: str, model: str, language: str = "", phone: str = "") -> str:
+    parts = [scope, model, normalise_prompt(prompt)]
+    if scope in ("language", "phone"):
+        parts.append(language.lower())
+    if scope == "phone":
+        parts.append(phone)
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def hit_rate() -> float:
+    hits = metrics.counters.get("llm_cache.hits", 0)
+    total = hits + metrics.counters.get("llm_cache.misses", 0)
+    return hits / total if total else 0.0
+
+
+metrics.register_gauge("llm_cache.hit_rate", hit_rate)
+
+
+async def cached_call(call_site: str, prompt: str, model: str, call: Callable[[], Awaitable[Tuple[Any, int]]],
+                      language: str = "", phone: str = "") -> Any:
+    """Return the cached response for this call site and prompt, or make the call and cache it.
+
+    call returns (response, tokens used); the token count is kept with the
+    entry so every later hit can be credited to llm_cache.saved_tokens.
+    Empty responses are not cached.
+    """
+    scope = scope_for(call_site)
+    if scope is None:
+        value, _ = await call()
+        return value
+
+    key = cache_key(scope, prompt, model, language, phone)
+    entry = await response_cache.get(key)
+    if entry is not MISS:
+        metrics.incr("llm_cache.hits")
+        metrics.incr(f"llm_cache.{call_site}.hits")
+        metrics.incr("llm_cache.saved_tokens", entry["tokens"])
+        return entry["value"]
+
+    metrics.incr("llm_cache.misses")
+    metrics.incr(f"llm_cache.{call_site}.misses")
+    value, tokens = await call()
+    if value:
+        await response_cache.set(key, {"value": value, "tokens": tokens}, settings.LLM_CACHE_TTL_SECONDS)
+    return value
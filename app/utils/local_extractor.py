@@ -0,0 +1,236 @@
+import re
+import unicodedata
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+from app.utils.metrics import metrics
+
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
+    "lunes": 0, "martes": 1, "miercoles": 2, "jueves": 3, "viernes": 4, "sabado": 5, "domingo": 6,
+}
+MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6, "july": 7,
+    "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7, "aug": 8, "sep": 9, "sept": 9,
+    "oct": 10, "nov": 11, "dec": 12,
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+    "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12,
+}
+# also an English verb and the Spanish "sea": only a month next to a day number that ends the date
+AMBIGUOUS_MONTHS = {"may", "mar"}
+MALE_WORDS = {"male", "man", "boy", "masculino", "hombre", "varon", "nino", "m"}
+FEMALE_WORDS = {"female", "woman", "girl", "femenino", "mujer", "nina", "f"}
+
+_WEEKDAY = "|".join(WEEKDAYS)
+_MONTH = "|".join(sorted(set(MONTHS) - AMBIGUOUS_MONTHS, key=len, reverse=True))
+_AMBIGUOUS_MONTH = "|".join(sorted(AMBIGUOUS_MONTHS))
+# what may follow a date with an ambiguous month: the end, punctuation or a time
+_DATE_END = r"(?=$|[^\w ]| (?:at|a las|a la)\b)"
+
+BOOKING_CODE = re.compile(r"\bivx[a-z0-9]{6}\b")
+DAY_AFTER_TOMORROW = re.compile(r"\b(day after tomorrow|pasado manana)\b")
+TODAY = re.compile(r"\b(today|hoy)\b")
+# "manana" after "la"/"por la"/"de la"/"esta"/"cada" is "the morning", not "tomorrow"
+TOMORROW = re.compile(r"\b(tomorrow|(?<!la )(?<!esta )(?<!cada )manana)\b")
+IN_DAYS = re.compile(r"\b(?:in|en|dentro de) (\d{1,3}) (?:days?|dias?)\b")
+WEEKDAY = re.compile(rf"\b({_WEEKDAY})\b")
+ISO_DATE = re.compile(r"\b(20\d{2})-(\d{1,2})-(\d{1,2})\b")
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/-](\d{1,2})[/-](20\d{2})\b")
+DAY_MONTH = r"\b(\d{{1,2}})(?:st|nd|rd|th)? (?:de |of )?({months})\b(?:,? (?:de |del )?(20\d{{2}}))?"
+MONTH_DAY = r"\b({months}) (\d{{1,2}})(?:st|nd|rd|th)?\b(?:,? (20\d{{2}}))?"
+# (pattern, day group, month group)
+MONTH_DATES = [
+    (re.compile(DAY_MONTH.format(months=_MONTH)), 1, 2),
+    (re.compile(MONTH_DAY.format(months=_MONTH)), 2, 1),
+    (re.compile(DAY_MONTH.format(months=_AMBIGUOUS_MONTH) + _DATE_END), 1, 2),
+    (re.compile(MONTH_DAY.format(months=_AMBIGUOUS_MONTH) + _DATE_END), 2, 1),
+]
+
+TIME_12H = re.compile(r"\b(1[0-2]|0?[1-9])(?::([0-5]\d))? ?(am|pm|a\.m\.|p\.m\.)(?![a-z])")
+TIME_24H = re.compile(r"(?<![\d/-])([01]?\d|2[0-3]):([0-5]\d)(?![\d/-])")
+TIME_SPANISH = re.compile(r"\ba las (\d{1,2})(?::([0-5]\d))?(?: ?(?:hrs|horas|h))?(?: de la (manana|tarde|noche))?")
+NOON = re.compile(r"\b(noon|midday|mediodia)\b")
+
+AGE_RANGE = re.compile(r"\b(\d{1,3}) ?(?:-|to|a|y) ?(\d{1,3}) ?(?:years?|yrs?|anos)\b")
+AGE = re.compile(r"\b(\d{1,3}) ?(?:years?(?: old)?|yrs?(?: old)?|y/o|anos(?: de edad)?)\b")
+AGE_PREFIX = re.compile(r"\b(?:aged?|edad(?: de)?) (\d{1,3})\b")
+
+
+def _normalise(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).split())
+
+
+def _valid_future(year: int, month: int, day: int, today: date) -> Optional[str]:
+    try:
+        parsed = date(year, month, day)
+    except ValueError:
+        return None
+    return parsed.isoformat() if parsed >= today else None
+
+
+def _relative_dates(text: str, today: date) -> Set[str]:
+    found = set()
+    if DAY_AFTER_TOMORROW.search(text):
+        found.add((today + timedelta(days=2)).isoformat())
+        # its "manana"/"tomorrow" is not a second mention
+        text = DAY_AFTER_TOMORROW.sub(" ", text)
+    if TODAY.search(text):
+        found.add(today.isoformat())
+    if TOMORROW.search(text):
+        found.add((today + timedelta(days=1)).isoformat())
+    for match in IN_DAYS.finditer(text):
+        found.add((today + timedelta(days=int(match.group(1)))).isoformat())
+    return found
+
+
+def _explicit_dates(text: str, today: date) -> Set[Optional[str]]:
+    """Calendar dates in text; None stands for one that is invalid or in the past"""
+    found: Set[Optional[str]] = set()
+    for match in ISO_DATE.finditer(text):
+        found.add(_valid_future(int(match.group(1)), int(match.group(2)), int(match.group(3)), today))
+
+    for match in NUMERIC_DATE.finditer(text):
+        first, second, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
+        # day first like validate_date, month first if that is the only valid reading
+        found.add(_valid_future(year, second, first, today) or _valid_future(year, first, second, today))
+
+    for pattern, day_group, month_group in MONTH_DATES:
+        for match in pattern.finditer(text):
+            day, month = int(match.group(day_group)), MONTHS[match.group(month_group)]
+            if match.group(3):
+                found.add(_valid_future(int(match.group(3)), month, day, today))
+            else:
+                found.add(_valid_future(today.year, month, day, today) or _valid_future(today.year + 1, month, day, today))
+    return found
+
+
+def extract_date(text: str, today: Optional[date] = None) -> Optional[str]:
+    """The one date text mentions, or None when it mentions none or several.
+
+    A weekday next to a calendar date ("viernes 23 de octubre") only has
+    to agree with it; any other second mention ("hoy quiero agendar para
+    el viernes") makes the text ambiguous, and it is left to the LLM.
+    """
+    today = today or datetime.now().date()
+    relative = _relative_dates(text, today)
+    explicit = _explicit_dates(text, today)
+    weekdays = {WEEKDAYS[match.group(1)] for match in WEEKDAY.finditer(text)}
+
+    if explicit:
+        if len(explicit) > 1 or relative or None in explicit:
+            return None
+        found = explicit.pop()
+        if weekdays and weekdays != {date.fromisoformat(found).weekday()}:
+            return None
+        return found
+
+    for weekday in weekdays:
+        days_ahead = weekday - today.weekday()
+        if days_ahead <= 0:
+            days_ahead += 7
+        relative.add((today + timedelta(days=days_ahead)).isoformat())
+    return relative.pop() if len(relative) == 1 else None
+
+
+def extract_time(text: str) -> Optional[str]:
+    match = TIME_12H.search(text)
+    if match:
+        hour, minute = int(match.group(1)) % 12, int(match.group(2) or 0)
+        if match.group(3).startswith("p"):
+            hour += 12
+        return f"{hour:02d}:{minute:02d}"
+
+    match = TIME_24H.search(text)
+    if match:
+        return f"{int(match.group(1)):02d}:{match.group(2)}"
+
+    match = TIME_SPANISH.search(text)
+    if match:
+        hour, minute, period = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+        if period in ("tarde", "noche") and hour < 12:
+            hour += 12
+        elif period is None and hour <= 7:
+            # "a las 3" is ambiguous without "de la tarde"; leave it to the LLM
+            return None
+        if hour > 23:
+            return None
+        return f"{hour:02d}:{minute:02d}"
+
+    if NOON.search(text):
+        return "12:00"
+    return None
+
+
+def extract_age_range(text: str) -> Optional[str]:
+    match = AGE_RANGE.search(text)
+    if match and int(match.group(1)) < int(match.group(2)) <= 120:
+        return f"{match.group(1)}-{match.group(2)}"
+
+    match = AGE.search(text) or AGE_PREFIX.search(text)
+    if match and int(match.group(1)) <= 120:
+        return match.group(1)
+    return None
+
+
+def extract_gender(text: str) -> Optional[str]:
+    words = set(re.findall(r"[a-z]+", text))
+    # single letters only count when they are the whole reply
+    if len(words) > 1:
+        words -= {"m", "f"}
+    male, female = bool(words & MALE_WORDS), bool(words & FEMALE_WORDS)
+    if male == female:
+        return None
+    return "male" if male else "female"
+
+
+def extract_booking_code(text: str) -> Optional[str]:
+    match = BOOKING_CODE.search(text)
+    return match.group(0).upper() if match else None
+
+
+EXTRACTORS: Dict[str, Callable[[str], Optional[str]]] = {
+    "date": extract_date,
+    "time": extract_time,
+    "patient_age_range": extract_age_range,
+    "patient_gender": extract_gender,
+    "booking_code": extract_booking_code,
+}
+
+
+def extract_local(text: str, requested_keys: Iterable[str]) -> Dict[str, str]:
+    """The requested fields that can be parsed deterministically from text.
+
+    Keys without a local extractor, or whose value is not found, are left
+    out so the caller only asks the LLM for those.
+    """
+    if not isinstance(text, str) or not text.strip():
+        return {}
+
+    normalised = _normalise(text)
+    found = {}
+    for key in requested_keys:
+        extractor = EXTRACTORS.get(key)
+        if extractor is None:
+            continue
+        value = extractor(normalised)
+        if value:
+            found[key] = value
+
+    if found:
+        metrics.incr("local_extractor.fields", len(found))
+    return found
+
+
+def fill_missing(found: Dict[str, Any], local: Dict[str, str]) -> Dict[str, Any]:
+    """found (the LLM's values) with the local parses filled in where the LLM gave none.
+
+    The LLM has the last word: local parses are pattern matches that can
+    misread a message. Disagreements are counted for tuning the patterns.
+    """
+    merged = dict(found)
+    for key, value in local.items():
+        if merged.get(key) and merged[key] != value:
+            metrics.incr("local_extractor.disagreements")
+        merged[key] = merged.get(key) or value
+    return merged
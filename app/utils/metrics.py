@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+
+class Metrics:
+    """Process-wide counters, gauges and latency samples"""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(Metrics, cls).__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self, max_samples: int = 2048):
+        self._lock = threading.Lock()
+        self.max_samples = max_samples
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.samples: Dict[str, Deque[float]] = {}
+        self.gauges: Dict[str, Callable[[], Any]] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.max_samples)
+            self.samples[name].append(value)
+
+    def register_gauge(self, name: str, fn: Callable[[], Any]):
+        self.gauges[name] = fn
+
+    def sample_count(self, name: str) -> int:
+        with self._lock:
+            return len(self.samples.get(name, ()))
+
+    def percentile(self, name: str, pct: float) -> float:
+        with self._lock:
+            values = sorted(self.samples.get(name, ()))
+        return _percentile(values, pct)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            samples = {name: sorted(values) for name, values in self.samples.items()}
+
+        summaries = {}
+        for name, values in samples.items():
+            summaries[name] = {
+                "count": len(values),
+                "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95),
+                "p99": _percentile(values, 99),
+                "max": values[-1] if values else 0.0,
+            }
+
+        gauges = {}
+        for name, fn in self.gauges.items():
+            try:
+                gauges[name] = fn()
+            except Exception as e:
+                gauges[name] = f"error: {e}"
+
+        return {"counters": counters, "latencies": summaries, "gauges": gauges}
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.samples.clear()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+metrics = Metrics()
+
+# LLM round trips made by the turn running in the current context
+_turn_llm_calls: ContextVar[Optional[List[int]]] = ContextVar("turn_llm_calls", default=None)
+
+
+@contextmanager
+def track_turn() -> Iterator[None]:
+    """Record latency and LLM calls of one inbound turn as turn.* samples"""
+    calls = [0]
+    token = _turn_llm_calls.set(calls)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _turn_llm_calls.reset(token)
+        metrics.observe("turn.latency_ms", (time.perf_counter() - started) * 1000)
+        metrics.observe("turn.llm_calls", calls[0])
+
+
+def count_llm_call():
+    metrics.incr("llm.calls")
+    calls = _turn_llm_calls.get()
+    if calls is not None:
+        calls[0] += 1
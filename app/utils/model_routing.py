@@ -0,0 +1,23 @@
+from typing import Any, Dict, NamedTuple, Optional
+from app.core.config import settings
+
+
+class Route(NamedTuple):
+    model: str
+    temperature: float
+    max_tokens: Optional[int] = None
+
+
+def route_for(call_site: str) -> Route:
+    """Model, temperature and max_tokens of a call site, from LLM_ROUTES and LLM_MODEL_TIERS"""
+    entry = settings.LLM_ROUTES.get(call_site, settings.LLM_DEFAULT_ROUTE)
+    return Route(settings.LLM_MODEL_TIERS[entry["tier"]], entry["temperature"], entry.get("max_tokens"))
+
+
+def route_kwargs(call_site: str) -> Dict[str, Any]:
+    """route_for as keyword arguments for a chat model or completion call"""
+    route = route_for(call_site)
+    kwargs: Dict[str, Any] = {"model": route.model, "temperature": route.temperature}
+    if route.max_tokens:
+        kwargs["max_tokens"] = route.max_tokens
+    return kwargs
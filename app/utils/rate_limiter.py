@@ -0,0 +1,193 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, Type
+from app.core.config import settings
+from app.utils.metrics import metrics
+
+
+def priority_for(call_site: str, priority: Optional[int] = None) -> int:
+    """Queue priority of a call (lower runs first): the explicit one, else its call site's"""
+    if priority is not None:
+        return priority
+    return settings.LLM_PRIORITIES.get(call_site, settings.LLM_DEFAULT_PRIORITY)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the API asked us to wait in a 429's retry-after(-ms) header, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers[header]) * scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+class TokenBucket:
+    """Refills per_minute units per minute, holding at most one minute's worth.
+
+    Taking more than is available leaves the bucket in debt, so a caller
+    that under-reserved is paid back by the ones after it. per_minute <= 0
+    disables the bucket.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.level = per_minute
+        self._rate = per_minute / 60
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until amount (at most the capacity) can be taken"""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(now)
+        shortfall = min(amount, self.capacity) - self.level
+        return shortfall / self._rate if shortfall > 0 else 0.0
+
+    def take(self, amount: float):
+        if self.capacity > 0:
+            self.level -= amount
+
+    def give(self, amount: float):
+        if self.capacity > 0:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Client-side limiter for one API: request and token buckets plus AIMD concurrency.
+
+    Calls queue by priority (then arrival) and start once a concurrency
+    slot is free, the request bucket has a request and the token bucket
+    has the call's estimated tokens. The concurrency limit grows by one per
+    limit's worth of successes and halves on every 429, which also pauses
+    all starts for the retry-after the API sent (or an exponential backoff).
+    Rate-limited calls and those raising one of retry_on are retried up to
+    max_retries times.
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int, max_concurrency: int, min_concurrency: int = 1,
+                 max_retries: int = 2, backoff: float = 1.0):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.inflight = 0
+        self.paused_until = 0.0
+        self._seq = itertools.count()
+        self._waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        metrics.register_gauge(f"{name}.inflight", lambda: self.inflight)
+        metrics.register_gauge(f"{name}.queued", lambda: self.queued)
+        metrics.register_gauge(f"{name}.concurrency_limit", lambda: round(self.limit, 2))
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, tokens: float, priority: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), tokens, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # granted just before the cancellation landed: hand the slot back
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self, reserved: float = 0, used: Optional[float] = None):
+        """Free a slot; with the tokens actually used, settle the reservation against them"""
+        self.inflight -= 1
+        if used is not None:
+            self.tokens.give(reserved - used)
+        self._dispatch()
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.inflight >= int(self.limit):
+                return  # the next release dispatches again
+
+            now = time.monotonic()
+            wait = max(self.paused_until - now, self.requests.delay(1, now), self.tokens.delay(tokens, now))
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+
+            heapq.heappop(self._waiters)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.inflight += 1
+            future.set_result(None)
+
+    def on_success(self):
+        self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def on_rate_limited(self, delay: float):
+        now = time.monotonic()
+        # 429s from calls already in flight when the first one paused us count once
+        if now >= self.paused_until:
+            self.limit = max(self.min_concurrency, self.limit / 2)
+        self.paused_until = max(self.paused_until, now + delay)
+        metrics.incr(f"{self.name}.rate_limited")
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], tokens: float, priority: int,
+                   usage: Callable[[Any], Optional[float]] = lambda result: None,
+                   retry_on: Tuple[Type[BaseException], ...] = ()) -> Any:
+        """Run fn under the limiter, reserving tokens; usage(result) settles the reservation"""
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            await self.acquire(tokens, priority)
+            metrics.observe(f"{self.name}.wait_ms", (time.perf_counter() - queued) * 1000)
+
+            used = None
+            try:
+                result = await fn()
+                used = usage(result)
+            except Exception as e:
+                backoff = self.backoff * 2 ** attempt * random.uniform(0.5, 1.0)
+                if getattr(e, "status_code", None) == 429:
+                    # the pause holds back every queued call, not just this retry
+                    self.on_rate_limited(retry_after(e) or backoff)
+                    backoff = 0.0
+                elif not isinstance(e, retry_on):
+                    raise
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                self.on_success()
+                return result
+            finally:
+                self.release(tokens, used)
+
+            attempt += 1
+            metrics.incr(f"{self.name}.retries")
+            await asyncio.sleep(backoff)
+
+
+openai_limiter = RateLimiter(
+    "openai", settings.OPENAI_RPM_LIMIT, settings.OPENAI_TPM_LIMIT, settings.OPENAI_MAX_CONCURRENCY,
+    settings.OPENAI_MIN_CONCURRENCY, settings.OPENAI_MAX_RETRIES, settings.OPENAI_BACKOFF_SECONDS
+)
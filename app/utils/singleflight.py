@@ -0,0 +1,43 @@
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from app.utils.metrics import metrics
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one in-flight call.
+
+    The first caller for a key runs fn; callers arriving while it is still
+    pending await the same future and get a deep copy of its result (or
+    the same exception). Nothing is cached once the call completes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+            return copy.deepcopy(await asyncio.shield(future))
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        metrics.incr(f"singleflight.{self.name}.leaders")
+        try:
+            result = await fn()
+        except BaseException as e:
+            future.set_exception(e)
+            # mark retrieved so a leader-only failure is not logged as unhandled
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
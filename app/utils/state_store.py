@@ -0,0 +1,219 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Set
+from app.core.config import settings
+
+
+class StateStore:
+    """Persistence backend for per-phone conversation state"""
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def load_all(self) -> Dict[str, Dict[str, Any]]:
+        """Records to keep resident from startup; lazy backends return {}"""
+        return {}
+
+    def keys(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def save(self, key: str, record: Dict[str, Any]):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class JsonStateStore(StateStore):
+    """All conversations in one JSON file, rewritten behind the callers' back.
+
+    save() encodes only the record that changed and marks it dirty; a flusher
+    thread writes the whole file at most once per flush_interval via an
+    atomic temp-file rename.
+    """
+
+    def __init__(self, storage_file: str, flush_interval: float = 0.2):
+        self.storage_file = storage_file
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._records = self._read_file()
+        self._encoded: Dict[str, str] = {}
+        self._dirty: Set[str] = set()
+        self._wake = threading.Event()
+
+        if self.flush_interval > 0:
+            threading.Thread(target=self._flush_loop, name=f"flusher-{storage_file}", daemon=True).start()
+        atexit.register(self.flush)
+
+    def _read_file(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            if os.path.exists(self.storage_file):
+                with open(self.storage_file, "r") as f:
+                    return json.load(f)
+            return {}
+        except Exception as e:
+            print(f"Error loading states: {e}")
+            return {}
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._records.get(key)
+
+    def load_all(self) -> Dict[str, Dict[str, Any]]:
+        return self._records
+
+    def keys(self) -> Iterator[str]:
+        return iter(list(self._records))
+
+    def save(self, key: str, record: Dict[str, Any]):
+        try:
+            encoded = json.dumps(record)
+        except (TypeError, ValueError) as e:
+            print(f"Error encoding state for {key}: {e}")
+            return
+
+        with self._lock:
+            self._records[key] = record
+            self._encoded[key] = encoded
+            self._dirty.add(key)
+        self._after_write()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._records.pop(key, None)
+            self._encoded.pop(key, None)
+            self._dirty.add(key)
+        self._after_write()
+
+    def _after_write(self):
+        if self.flush_interval > 0:
+            self._wake.set()
+        else:
+            self.flush()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write pending changes to disk; safe to call from any thread"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._dirty = set()
+                # records loaded at startup are encoded the first time we write
+                for key, record in self._records.items():
+                    if key not in self._encoded:
+                        self._encoded[key] = json.dumps(record)
+                items = list(self._encoded.items())
+
+            tmp_file = f"{self.storage_file}.tmp"
+            try:
+                with open(tmp_file, "w") as f:
+                    f.write("{")
+                    f.write(", ".join(f"{json.dumps(key)}: {value}" for key, value in items))
+                    f.write("}")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.storage_file)
+            except Exception as e:
+                print(f"Error saving states: {e}")
+
+
+class SqliteStateStore(StateStore):
+    """One row per phone number in an SQLite database running in WAL mode"""
+
+    def __init__(self, db_path: str, table: str):
+        self.db_path = db_path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT data FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def keys(self) -> Iterator[str]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT key FROM {self.table}").fetchall()
+        return (row[0] for row in rows)
+
+    def save(self, key: str, record: Dict[str, Any]):
+        try:
+            encoded = json.dumps(record)
+        except (TypeError, ValueError) as e:
+            print(f"Error encoding state for {key}: {e}")
+            return
+
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO {self.table} (key, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (key, encoded, time.time())
+            )
+            self._conn.commit()
+
+    def save_many(self, records: Dict[str, Dict[str, Any]]):
+        now = time.time()
+        rows = [(key, json.dumps(record), now) for key, record in records.items()]
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, data, updated_at) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_state_store(table: str, storage_file: str) -> StateStore:
+    """Build the backend selected by STATE_BACKEND ("json" or "sqlite")"""
+    if settings.STATE_BACKEND == "sqlite":
+        return SqliteStateStore(settings.STATE_DB_PATH, table)
+    return JsonStateStore(storage_file, flush_interval=settings.STATE_FLUSH_INTERVAL_MS / 1000)
+
+
+def create_archive_store(table: str) -> Optional[StateStore]:
+    """Cold storage for evicted conversations; the sqlite backend needs none"""
+    if settings.STATE_BACKEND == "sqlite":
+        return None
+    return SqliteStateStore(settings.STATE_ARCHIVE_PATH, f"{table}_archive")
+
+
+def migrate_json_to_sqlite(storage_file: str, db_path: str, table: str) -> int:
+    """Copy every conversation from a JSON state file into an SQLite table"""
+    source = JsonStateStore(storage_file, flush_interval=0)
+    records = source.load_all()
+    target = SqliteStateStore(db_path, table)
+    try:
+        target.save_many(records)
+    finally:
+        target.close()
+    return len(records)
@@ -0,0 +1,59 @@
+from typing import Any, List, Optional, Sequence
+from app.core.config import settings
+from app.utils.metrics import metrics
+from app.utils.tokens import DEFAULT_MODEL, count_message_tokens, count_tokens, encoding_for
+
+
+def budget_for(call_site: str) -> int:
+    """Prompt token budget of a call site (the completion is not included)"""
+    return settings.LLM_TOKEN_BUDGETS.get(call_site, settings.LLM_DEFAULT_TOKEN_BUDGET)
+
+
+def trim_text(text: Optional[str], max_tokens: int, model: str = DEFAULT_MODEL, keep_end: bool = False) -> Optional[str]:
+    """text cut to at most max_tokens, keeping its start (or its end, for transcripts)"""
+    if not text or count_tokens(text, model) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    encoding = encoding_for(model)
+    if encoding is None:
+        chars = max_tokens * 4
+        return "…" + text[-chars:] if keep_end else text[:chars] + "…"
+    tokens = encoding.encode(text, disallowed_special=())
+    return "…" + encoding.decode(tokens[-max_tokens:]) if keep_end else encoding.decode(tokens[:max_tokens]) + "…"
+
+
+def fit_history(fixed: Sequence[Any], history: Sequence[Any], budget: int, model: str = DEFAULT_MODEL) -> List[Any]:
+    """The most recent history messages that fit in budget next to the fixed messages.
+
+    A leading system message (the rolling summary) is dropped last, after
+    every turn it precedes.
+    """
+    available = budget - count_message_tokens(fixed, model)
+    history = list(history)
+    summary = history.pop(0) if history and getattr(history[0], "type", None) == "system" else None
+
+    kept: List[Any] = []
+    for message in reversed(history):
+        cost = count_message_tokens([message], model)
+        if cost > available:
+            break
+        kept.insert(0, message)
+        available -= cost
+
+    if summary is not None and count_message_tokens([summary], model) <= available:
+        kept.insert(0, summary)
+    return kept
+
+
+def record_usage(call_site: str, prompt_tokens: int, completion_tokens: int, latency_ms: float, budget: Optional[int] = None):
+    """Attribute one LLM call's tokens and latency to its call site"""
+    metrics.incr(f"llm.{call_site}.calls")
+    metrics.incr(f"llm.{call_site}.prompt_tokens", prompt_tokens)
+    metrics.incr(f"llm.{call_site}.completion_tokens", completion_tokens)
+    metrics.incr("llm.prompt_tokens", prompt_tokens)
+    metrics.incr("llm.completion_tokens", completion_tokens)
+    metrics.observe(f"llm.{call_site}.latency_ms", latency_ms)
+    if budget is not None and prompt_tokens > budget:
+        metrics.incr(f"llm.{call_site}.over_budget")
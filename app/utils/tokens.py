@@ -0,0 +1,44 @@
+import json
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+try:
+    import tiktoken # type: ignore
+except ImportError:
+    tiktoken = None
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+# chat formatting overhead per message (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=16)
+def encoding_for(model: str) -> Optional[Any]:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: Any, model: str = DEFAULT_MODEL) -> int:
+    """Tokens in text for model; ~4 characters per token when tiktoken is unavailable"""
+    if text is None:
+        return 0
+    if not isinstance(text, str):
+        text = json.dumps(text, default=str)
+
+    encoding = encoding_for(model)
+    if encoding is None:
+        return max(1, len(text) // 4) if text else 0
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: Iterable[Any], model: str = DEFAULT_MODEL) -> int:
+    """Prompt tokens of chat messages, either LangChain messages or OpenAI-style dicts"""
+    total = 0
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else message.content
+        total += count_tokens(content, model) + MESSAGE_OVERHEAD_TOKENS
+    return total
@@ -0,0 +1,66 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from app.models.models import Message
+from app.utils.logger import setup_logger
+
+logger = setup_logger("webhook", "webhook.log")
+
+
+def extract_message_text(raw: Dict[str, Any]) -> Optional[str]:
+    """Pull the text we route on out of a single webhook message"""
+    message_type = raw.get("type")
+
+    if message_type == "text":
+        return raw.get("text", {}).get("body")
+    if message_type == "button":
+        return raw.get("button", {}).get("text")
+    if message_type == "location":
+        location = raw.get("location", {})
+        if location.get("latitude") and location.get("longitude"):
+            return location.get("address")
+        return "Location data missing."
+    if message_type == "audio":
+        return raw.get("audio", {}).get("id")
+    if message_type == "interactive":
+        interactive = raw.get("interactive", {})
+        return interactive.get("list_reply", {}).get("id") or interactive.get("button_reply", {}).get("id")
+
+    logger.warning(f"Unhandled message type: {message_type}")
+    return None
+
+
+def parse_webhook(body: Dict[str, Any]) -> Tuple[List[Message], List[Dict[str, Any]]]:
+    """Walk every entry/change in a webhook body and build all messages in one pass.
+
+    Returns the inbound messages in payload order together with any delivery
+    statuses Meta batched alongside them.
+    """
+    messages: List[Message] = []
+    statuses: List[Dict[str, Any]] = []
+    received_at = datetime.now()
+
+    for entry in body.get("entry") or []:
+        for change in entry.get("changes") or []:
+            value = change.get("value") or {}
+            business_phone_number_id = value.get("metadata", {}).get("phone_number_id")
+            statuses.extend(value.get("statuses") or [])
+
+            for raw in value.get("messages") or []:
+                message_type = raw.get("type")
+                if not message_type:
+                    continue
+
+                message_text = extract_message_text(raw)
+                if not message_text:
+                    continue
+
+                messages.append(Message(
+                    message_id=raw.get("id"),
+                    phone_number=raw.get("from"),
+                    type=message_type,
+                    content=message_text,
+                    timestamp=received_at,
+                    business_phone_number_id=business_phone_number_id
+                ))
+
+    return messages, statuses
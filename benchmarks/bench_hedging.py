@@ -0,0 +1,91 @@
+"""Tail latency of LLM calls with and without hedging, without network calls.
+
+Runs --calls calls, --concurrency at a time, against a simulated completion
+whose latency is --latency-ms most of the time, 10x that for --slow-pct of
+calls and 50x for a tenth of those (a stalled request). "plain" awaits
+every call to the end, as before; "hedged" goes through hedged_call with
+a deadline of 20x the base latency and an instant fallback, after warming
+up the p90 estimate. Reports p50/p99, the hedge rate, the hedges the
+budget denied and how often the hedge or the fallback won.
+
+    python -m benchmarks.bench_hedging [--calls 2000] [--concurrency 16] [--latency-ms 40] [--slow-pct 8]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+for key in ("GRAPH_API_TOKEN", "WEBHOOK_VERIFY_TOKEN", "WHATSAPP_BUSINESS_ACCOUNT_ID",
+            "BUBBLE_API_KEY", "BUBBLE_API_URL", "OPENAI_API_KEY"):
+    os.environ.setdefault(key, "bench")
+
+from app.core.config import settings
+from app.utils.hedging import hedged_call
+from app.utils.metrics import metrics
+
+CALL_SITE = "bench"
+
+
+def completion(latency: float, slow_pct: float):
+    async def attempt(fallback: bool):
+        if fallback:
+            await asyncio.sleep(latency)
+            return "fallback"
+        roll = random.random() * 100
+        await asyncio.sleep(latency * (50 if roll < slow_pct / 10 else 10 if roll < slow_pct else 1))
+        return "primary"
+    return attempt
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run(label: str, calls: int, concurrency: int, call) -> list:
+    semaphore, timings = asyncio.Semaphore(concurrency), []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            timings.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    print(f"{label:>7}: p50 {percentile(timings, 50):8.1f} ms  p99 {percentile(timings, 99):8.1f} ms")
+    return timings
+
+
+async def main(calls: int, concurrency: int, latency_ms: float, slow_pct: float):
+    latency = latency_ms / 1000
+    attempt = completion(latency, slow_pct)
+    settings.LLM_HEDGE_CALL_SITES = [CALL_SITE]
+    settings.LLM_DEADLINES = {CALL_SITE: latency * 20}
+    settings.LLM_FALLBACK_MODEL = "fallback"
+    settings.LLM_FALLBACK_DEADLINE_SECONDS = latency * 20
+
+    plain = await run("plain", calls, concurrency, lambda: attempt(False))
+
+    for _ in range(settings.LLM_HEDGE_MIN_SAMPLES):
+        await hedged_call(CALL_SITE, attempt)
+    before = dict(metrics.snapshot()["counters"])
+    hedged = await run("hedged", calls, concurrency, lambda: hedged_call(CALL_SITE, attempt))
+
+    after = metrics.snapshot()["counters"]
+    counted = {name: after.get(f"llm.{CALL_SITE}.{name}", 0) - before.get(f"llm.{CALL_SITE}.{name}", 0)
+               for name in ("hedges", "hedges_denied", "hedge_wins", "fallbacks")}
+    print(f"hedge rate {counted['hedges'] / calls:.1%}  denied {counted['hedges_denied']:.0f}  "
+          f"hedge wins {counted['hedge_wins']:.0f}  "
+          f"fallbacks {counted['fallbacks']:.0f}  "
+          f"p99 {percentile(plain, 99) / percentile(hedged, 99):.1f}x lower")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--slow-pct", type=float, default=8.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency, args.latency_ms, args.slow_pct))
@@ -0,0 +1,136 @@
+"""How many conversations one worker can progress at once.
+
+Runs --conversations concurrent turns on a single event loop, each making
+--calls chat completions against a local stand-in OpenAI server that takes
+--latency-ms per completion. The old pattern (sync OpenAI client inside an
+async def) blocks the loop for every call, so turns run one at a time; the
+shared AsyncOpenAI client overlaps them up to OPENAI_MAX_CONCURRENCY.
+
+    python -m benchmarks.bench_openai_concurrency [--conversations 32] [--calls 3] [--latency-ms 250]
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+
+for key in ("GRAPH_API_TOKEN", "WEBHOOK_VERIFY_TOKEN", "WHATSAPP_BUSINESS_ACCOUNT_ID",
+            "BUBBLE_API_KEY", "BUBBLE_API_URL", "OPENAI_API_KEY"):
+    os.environ.setdefault(key, "bench")
+
+from openai import OpenAI # type: ignore
+
+COMPLETION = {
+    "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "gpt-3.5-turbo",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "create_appointment"}}],
+    "usage": {"prompt_tokens": 50, "completion_tokens": 3, "total_tokens": 53},
+}
+
+
+class StandInOpenAI:
+    """Minimal HTTP/1.1 server answering every request with a canned completion"""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.inflight = 0
+        self.peak = 0
+        self.port = 0
+        self._ready = threading.Event()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        body = json.dumps(COMPLETION).encode()
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+
+                self.inflight += 1
+                self.peak = max(self.peak, self.inflight)
+                await asyncio.sleep(self.latency)
+                self.inflight -= 1
+
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    def serve_in_thread(self):
+        async def serve():
+            server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await server.serve_forever()
+
+        threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+        self._ready.wait()
+
+
+MESSAGES = [{"role": "user", "content": "quiero agendar una cita"}]
+
+
+async def blocking_turn(client: OpenAI, calls: int):
+    for _ in range(calls):
+        client.chat.completions.create(model="gpt-3.5-turbo", messages=MESSAGES, temperature=0.3)
+
+
+async def async_turn(calls: int):
+    from app.services.openai import chat_completion
+
+    for _ in range(calls):
+        await chat_completion(MESSAGES, temperature=0.3)
+
+
+async def loop_lag(stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        samples.append((time.perf_counter() - started - 0.01) * 1000)
+
+
+async def run(label: str, server: StandInOpenAI, make_turn, conversations: int):
+    server.peak = 0
+    stop, lag = asyncio.Event(), []
+    ticker = asyncio.create_task(loop_lag(stop, lag))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(make_turn() for _ in range(conversations)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    print(f"{label:>9}: {elapsed:6.2f} s  {conversations / elapsed:7.1f} turns/s  "
+          f"peak {server.peak:>3} concurrent completions  max loop lag {max(lag or [0]):7.1f} ms")
+    return elapsed
+
+
+async def main(conversations: int, calls: int, latency_ms: float):
+    server = StandInOpenAI(latency_ms)
+    server.serve_in_thread()
+    base_url = f"http://127.0.0.1:{server.port}/v1"
+    os.environ["OPENAI_BASE_URL"] = base_url
+
+    sync_client = OpenAI(api_key="bench", base_url=base_url)
+    before = await run("blocking", server, lambda: blocking_turn(sync_client, calls), conversations)
+    after = await run("async", server, lambda: async_turn(calls), conversations)
+    print(f"speedup: {before / after:.1f}x with {conversations} conversations on one worker")
+
+    from app.services.openai import close_openai_client
+    await close_openai_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=32)
+    parser.add_argument("--calls", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=250.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.conversations, args.calls, args.latency_ms))
@@ -0,0 +1,101 @@
+"""Per-turn orchestration overhead of the clinic graph, without network calls.
+
+Runs --turns turns through the clinic StateGraph with an assistant whose
+nodes do nothing (classify_intent -> check_appointment_status -> END), so
+the time measured is LangGraph's own. "per-turn" compiles the graph for
+every turn, as ClinicAssistant.__init__ used to; "shared" reuses the graph
+compiled at import and passes the assistant through the run config. The
+reply path is compared the same way: building a RunnableWithMessageHistory
+per invoke_ai call, as before, against formatting response_prompt with the
+budget-fitted history as helpers.complete_reply does now.
+
+    python -m benchmarks.bench_orchestration [--turns 500]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+for key in ("GRAPH_API_TOKEN", "WEBHOOK_VERIFY_TOKEN", "WHATSAPP_BUSINESS_ACCOUNT_ID",
+            "BUBBLE_API_KEY", "BUBBLE_API_URL", "OPENAI_API_KEY"):
+    os.environ.setdefault(key, "bench")
+
+from langchain_core.messages import AIMessage, HumanMessage # type: ignore
+from langchain_core.runnables.history import RunnableWithMessageHistory # type: ignore
+from langgraph.graph import END # type: ignore
+from app.services import langgraph
+from app.utils import helpers
+from app.utils.graph_nodes import turn_config
+from app.utils.token_budget import budget_for, fit_history
+
+
+class NoOpAssistant:
+    async def classify_intent(self, _):
+        return {}
+
+    async def check_appointment_status(self, _):
+        return {}
+
+    def _route_after_classify(self, _):
+        return "check_appointment_status"
+
+    def _route_after_check_appointment_status(self, _):
+        return END
+
+
+def report(label: str, timings: list):
+    timings.sort()
+    print(f"{label:>22}: p50 {timings[len(timings) // 2]:8.3f} ms  p99 {timings[int(len(timings) * 0.99)]:8.3f} ms")
+
+
+async def run_turns(turns: int, compile_per_turn: bool) -> list:
+    assistant, timings = NoOpAssistant(), []
+    for i in range(turns):
+        started = time.perf_counter()
+        graph = langgraph._build_graph() if compile_per_turn else langgraph.graph
+        async for _ in graph.astream({"user_input": "status"}, config=turn_config(assistant, f"bench-{i}")):
+            pass
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def build_runnables(turns: int) -> list:
+    timings = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        RunnableWithMessageHistory(
+            runnable=helpers.response_chain,
+            get_session_history=lambda session_id: helpers.get_message_history(session_id),
+            input_messages_key="input",
+            history_messages_key="chat_history",
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def format_prompts(turns: int) -> list:
+    history = [HumanMessage(content="quiero agendar una cita para mañana a las 10"),
+               AIMessage(content="¡Claro! ¿Para qué procedimiento y qué paciente?")] * 3
+    timings = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        fixed = helpers.response_prompt.format_messages(input="status", chat_history=[])
+        helpers.response_prompt.format_messages(
+            input="status", chat_history=fit_history(fixed, history, budget_for("reply"))
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def main(turns: int):
+    report("graph per-turn", await run_turns(turns, compile_per_turn=True))
+    report("graph shared", await run_turns(turns, compile_per_turn=False))
+    report("runnable per-call", build_runnables(turns))
+    report("prompt with budget", format_prompts(turns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.turns))
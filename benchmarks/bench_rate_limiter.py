@@ -0,0 +1,103 @@
+"""Burst behaviour against a rate-limited API, without network calls.
+
+Fires --calls completions at once at a simulated API that takes
+--latency-ms per call and answers 429 (retry-after 1 s) beyond --capacity
+concurrent calls. "fixed retry" is the old pattern: every caller retries
+after its own 2 s/4 s sleeps, so the burst keeps hitting the limit;
+"limiter" runs the same calls through a RateLimiter, which halves its
+concurrency on the first 429 and pauses every queued call together. One
+call in ten is a doctor turn at priority 0; its queueing time is reported
+next to the rest.
+
+    python -m benchmarks.bench_rate_limiter [--calls 200] [--capacity 8] [--latency-ms 100]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+for key in ("GRAPH_API_TOKEN", "WEBHOOK_VERIFY_TOKEN", "WHATSAPP_BUSINESS_ACCOUNT_ID",
+            "BUBBLE_API_KEY", "BUBBLE_API_URL", "OPENAI_API_KEY"):
+    os.environ.setdefault(key, "bench")
+
+from app.utils.rate_limiter import RateLimiter
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    class response:
+        headers = {"retry-after": "1"}
+
+
+class SimulatedAPI:
+    def __init__(self, capacity: int, latency_ms: float):
+        self.capacity = capacity
+        self.latency = latency_ms / 1000
+        self.inflight = 0
+        self.rejected = 0
+
+    async def complete(self):
+        if self.inflight >= self.capacity:
+            self.rejected += 1
+            raise RateLimited()
+        self.inflight += 1
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.inflight -= 1
+
+
+async def fixed_retry(api: SimulatedAPI, priority: int):
+    delay = 2
+    for attempt in range(3):
+        try:
+            return await api.complete()
+        except RateLimited:
+            if attempt < 2:
+                await asyncio.sleep(delay)
+                delay *= 2
+    raise RateLimited()
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+async def run(label: str, calls: int, api: SimulatedAPI, make_call):
+    timings = {0: [], 5: []}
+    failed = 0
+
+    async def one(i: int):
+        nonlocal failed
+        priority = 0 if i % 10 == 0 else 5
+        started = time.perf_counter()
+        try:
+            await make_call(api, priority)
+        except RateLimited:
+            failed += 1
+        timings[priority].append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:>12}: {elapsed:6.2f} s  429s {api.rejected:>5}  failed {failed:>4}  "
+          f"p50 doctor {percentile(timings[0], 50):8.1f} ms  p50 other {percentile(timings[5], 50):8.1f} ms")
+
+
+async def main(calls: int, capacity: int, latency_ms: float):
+    await run("fixed retry", calls, SimulatedAPI(capacity, latency_ms), fixed_retry)
+
+    limiter = RateLimiter("bench", rpm=0, tpm=0, max_concurrency=capacity * 2, max_retries=5)
+    await run("limiter", calls, SimulatedAPI(capacity, latency_ms),
+              lambda api, priority: limiter.call(api.complete, 0, priority))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.capacity, args.latency_ms))
@@ -0,0 +1,65 @@
+"""StateManager update throughput at 1k, 10k and 100k stored conversations.
+
+Compares the write-behind flusher against writing the whole file through on
+every update (STATE_FLUSH_INTERVAL_MS=0, the previous behaviour).
+
+    python -m benchmarks.bench_state_updates
+"""
+import json
+import os
+import tempfile
+import time
+from app.utils.state_manager import StateManager
+from app.utils.state_store import JsonStateStore
+
+UPDATES = 2000
+WRITE_THROUGH_UPDATES = 20
+
+
+def seed_file(path: str, conversations: int):
+    states = {
+        f"52144{i:07d}": {
+            "full_name": "Dr. Example", "clinic_name": "Clinic", "intent": "create_appointment",
+            "needs_clarification": True, "service_type": "General checkup", "date": "2025-03-16",
+            "time": "13:00", "history": [],
+        }
+        for i in range(conversations)
+    }
+    with open(path, "w") as f:
+        json.dump(states, f)
+
+
+def make_manager(path: str, flush_interval: float) -> StateManager:
+    manager = object.__new__(StateManager)
+    manager._initialize(store=JsonStateStore(path, flush_interval=flush_interval))
+    return manager
+
+
+def run(conversations: int, flush_interval: float, updates: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "user_states.json")
+        seed_file(path, conversations)
+        manager = make_manager(path, flush_interval)
+
+        started = time.perf_counter()
+        for i in range(updates):
+            phone = f"52144{(i * 7919) % conversations:07d}"
+            manager.update_state(phone, {"intent": "edit_appointment", "needs_clarification": i % 2 == 0})
+        manager.flush()
+        elapsed = time.perf_counter() - started
+
+        with open(path) as f:
+            assert len(json.load(f)) == conversations
+        return updates / elapsed
+
+
+def main():
+    for conversations in (1_000, 10_000, 100_000):
+        behind = run(conversations, flush_interval=0.2, updates=UPDATES)
+        through = run(conversations, flush_interval=0, updates=WRITE_THROUGH_UPDATES)
+        print(f"{conversations:>7} conversations: write-behind {behind:10.0f} updates/s  "
+              f"write-through {through:8.1f} updates/s  ({behind / through:6.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""LLM round trips and latency of clinic turns with and without the turn analysis.
+
+Runs --conversations scripted booking conversations through
+engine.process_inbound_message against a local stand-in for the OpenAI,
+Graph and Bubble APIs, where every completion takes --latency-ms. Each
+conversation runs once with TURN_ANALYSIS_ENABLED off (classify_intent,
+the extractor and the confirmation prompts each ask the LLM) and once
+with it on (one structured analyze_turn call per message), and the
+turn.llm_calls / turn.latency_ms samples of each run are reported.
+
+The LLM response cache and the history summary are off, and state lives
+in a scratch directory, so both runs start from the same clean slate.
+
+    python -m benchmarks.bench_turn_analysis [--conversations 20] [--latency-ms 300]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+for key in ("GRAPH_API_TOKEN", "WEBHOOK_VERIFY_TOKEN", "WHATSAPP_BUSINESS_ACCOUNT_ID",
+            "BUBBLE_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(key, "bench")
+os.environ.update({
+    "LLM_CACHE_ENABLED": "false", "HISTORY_SUMMARY_ENABLED": "false", "HISTORY_DB_PATH": "",
+    "INTENT_LOG_PATH": "", "STATE_BACKEND": "sqlite", "STATE_FLUSH_INTERVAL_MS": "0",
+})
+
+# (message, intent, confirmation intent, entities the LLM would find)
+SCRIPT = [
+    ("Hola, quiero agendar una cita por favor", "create_appointment", "OTHER", {}),
+    ("Es una limpieza dental para la paciente María López", "create_appointment", "CHANGE_REQUEST",
+     {"service_type": "limpieza dental", "patient_name": "María López"}),
+    ("Es mujer, tiene entre 30 y 40 años, y la cita sería en Guadalajara", "create_appointment", "CHANGE_REQUEST",
+     {"patient_gender": "female", "patient_age_range": "30-40", "location": "Guadalajara"}),
+    ("El 24 de octubre a las 10:30 de la mañana", "create_appointment", "CHANGE_REQUEST",
+     {"date": "2026-10-24", "time": "10:30"}),
+    ("Ninguna nota adicional, gracias", "create_appointment", "CHANGE_REQUEST", {"additional_note": "ninguna"}),
+    ("Todo correcto, confirmo la cita", "create_appointment", "CONFIRM", {}),
+]
+
+
+def scripted_turn(body: str):
+    for turn in SCRIPT:
+        if turn[0] in body:
+            return turn
+    return SCRIPT[0]
+
+
+def completion_content(request: dict) -> str:
+    messages = request.get("messages", [])
+    prompt = messages[-1]["content"] if messages else ""
+    _, intent, confirmation, entities = scripted_turn(json.dumps(request, ensure_ascii=False))
+
+    response_format = request.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        keys = response_format["json_schema"]["schema"]["properties"]["entities"]["properties"]
+        return json.dumps({"intent": intent, "confirmation_intent": confirmation, "booking_code": None,
+                           "entities": {key: entities.get(key) for key in keys}})
+    if "Extract the following keys" in prompt:
+        return json.dumps(entities)
+    if "Respond with only the intent label" in prompt:
+        return confirmation if confirmation in prompt and confirmation != "OTHER" else intent
+    return "¡Perfecto! ¿Me ayudas con el siguiente dato?"
+
+
+class StandInAPIs:
+    """HTTP/1.1 server answering OpenAI completions after a delay, and Graph/Bubble calls at once"""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.port = 0
+        self._ready = threading.Event()
+
+    async def respond(self, method: str, path: str, body: bytes) -> dict:
+        if path.endswith("/chat/completions"):
+            await asyncio.sleep(self.latency)
+            request = json.loads(body)
+            return {
+                "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": request.get("model"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": completion_content(request)}}],
+                "usage": {"prompt_tokens": 200, "completion_tokens": 20, "total_tokens": 220},
+            }
+        if path.endswith("/messages"):
+            return {"messages": [{"id": "wamid.bench"}]}
+        if method == "GET":
+            return {"response": {"results": [], "count": 0, "remaining": 0}}
+        return {"status": "success", "id": "bench"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.split(b"\r\n")
+                method, path = lines[0].split(b" ")[:2]
+                length = 0
+                for line in lines[1:]:
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                body = await reader.readexactly(length) if length else b""
+
+                payload = json.dumps(await self.respond(method.decode(), path.decode().split("?")[0], body)).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: " + str(len(payload)).encode() + b"\r\n\r\n" + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    def serve_in_thread(self):
+        async def serve():
+            server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await server.serve_forever()
+
+        threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+        self._ready.wait()
+
+
+async def run(label: str, conversations: int, enabled: bool):
+    from app.core.config import settings
+    from app.engine import process_inbound_message
+    from app.models.models import Message
+    from app.utils.metrics import metrics
+    from app.utils.state_manager import StateManager
+
+    settings.TURN_ANALYSIS_ENABLED = enabled
+    metrics.reset()
+    for c in range(conversations):
+        phone = f"52100{int(enabled)}{c:05d}"
+        # a registered clinic, so the conversation goes straight to booking
+        StateManager().update_state(phone, {"full_name": "Ana Ruiz", "clinic_name": "Clínica Centro",
+                                            "clinic_phone": phone, "language": "spanish"})
+        for i, (text, *_) in enumerate(SCRIPT):
+            message = Message(message_id=f"wamid.{phone}.{i}", phone_number=phone, type="text", content=text,
+                              timestamp=datetime.now(), business_phone_number_id="bench")
+            with contextlib.redirect_stdout(io.StringIO()):
+                await process_inbound_message(message)
+
+    snapshot = metrics.snapshot()
+    calls = snapshot["counters"].get("llm.calls", 0)
+    turns = conversations * len(SCRIPT)
+    latency = snapshot["latencies"]["turn.latency_ms"]
+    llm_calls = snapshot["latencies"]["turn.llm_calls"]
+    print(f"{label:>17}: {calls / turns:5.2f} LLM calls/turn (p50 {llm_calls['p50']:.0f}, max {llm_calls['max']:.0f})  "
+          f"turn p50 {latency['p50']:7.0f} ms  p95 {latency['p95']:7.0f} ms")
+
+
+async def main(conversations: int):
+    await run("separate prompts", conversations, enabled=False)
+    await run("turn analysis", conversations, enabled=True)
+
+    from app.services.openai import close_openai_client
+    await close_openai_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    apis = StandInAPIs(args.latency_ms)
+    apis.serve_in_thread()
+    base_url = f"http://127.0.0.1:{apis.port}"
+    os.environ.update({"OPENAI_BASE_URL": f"{base_url}/v1", "GRAPH_API_URL": base_url, "BUBBLE_API_URL": base_url})
+    # state, history and log files go to a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="bench_turn_analysis_"))
+    logging.disable(logging.CRITICAL)
+    asyncio.run(main(args.conversations))
@@ -0,0 +1,62 @@
+"""Webhook ingestion cost per message for synthetic 1/10/100-message payloads.
+
+Measures parse_webhook plus dispatch into the per-phone queues, with a no-op
+message handler so only ingestion is timed.
+
+    python -m benchmarks.bench_webhook_ingestion
+"""
+import asyncio
+import time
+from app.utils.dispatcher import MessageDispatcher
+from app.utils.webhook import parse_webhook
+
+ROUNDS = 200
+
+
+def build_payload(count: int, phones: int = 10) -> dict:
+    messages = []
+    for i in range(count):
+        if i % 3 == 0:
+            raw = {"type": "interactive", "interactive": {"button_reply": {"id": "CONFIRM_ALL"}}}
+        else:
+            raw = {"type": "text", "text": {"body": f"message number {i}"}}
+        raw.update({"id": f"wamid.{count}.{i}", "from": f"52144200{i % phones:04d}"})
+        messages.append(raw)
+
+    # split across entries/changes the way Meta batches bursts
+    changes = [
+        {"value": {"metadata": {"phone_number_id": "551871334675111"}, "messages": messages[i:i + 5],
+                   "statuses": [{"id": f"wamid.status.{i}", "status": "delivered"}]}}
+        for i in range(0, count, 5)
+    ]
+    return {"entry": [{"changes": changes[i:i + 2]} for i in range(0, len(changes), 2)]}
+
+
+async def _noop(_):
+    return None
+
+
+async def run(count: int):
+    payload = build_payload(count)
+    dispatcher = MessageDispatcher(handler=_noop, workers=8)
+    await dispatcher.start()
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        messages, _ = parse_webhook(payload)
+        for message in messages:
+            dispatcher.submit(message)
+    elapsed = time.perf_counter() - started
+
+    await dispatcher.stop()
+    per_message_us = elapsed / (ROUNDS * count) * 1e6
+    print(f"{count:>4} messages/payload: {elapsed / ROUNDS * 1e3:8.3f} ms/payload  {per_message_us:8.2f} us/message")
+
+
+async def main():
+    for count in (1, 10, 100):
+        await run(count)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""Sequential send latency against a local stand-in Graph API server.
+
+Sends bursts of four messages back to back (the shape of
+_handle_confirmation_success) through WhatsAppBusinessAPI, once with a new
+httpx.AsyncClient per request (the previous behaviour) and once through the
+shared pooled client. The stand-in server delays every new connection by
+--handshake-ms to stand in for the TCP+TLS setup to graph.facebook.com.
+
+    python -m benchmarks.bench_whatsapp_send [--bursts 50] [--handshake-ms 80]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+
+for key in ("GRAPH_API_TOKEN", "WEBHOOK_VERIFY_TOKEN", "WHATSAPP_BUSINESS_ACCOUNT_ID",
+            "BUBBLE_API_KEY", "BUBBLE_API_URL", "OPENAI_API_KEY"):
+    os.environ.setdefault(key, "bench")
+os.environ.setdefault("STATE_FLUSH_INTERVAL_MS", "1000")
+
+import httpx # type: ignore
+from app.models.models import Message
+from app.services.http_client import whatsapp_http
+from app.services.whatsapp import WhatsAppBusinessAPI
+
+RESPONSE = json.dumps({"messaging_product": "whatsapp", "messages": [{"id": "wamid.bench"}]}).encode()
+
+
+class StandInGraphApi:
+    def __init__(self, handshake_ms: float):
+        self.handshake = handshake_ms / 1000
+        self.connections = 0
+        self.requests = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        await asyncio.sleep(self.handshake)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                self.requests += 1
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: " + str(len(RESPONSE)).encode() + b"\r\n\r\n" + RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+async def send_unpooled(api: WhatsAppBusinessAPI, payload: dict):
+    async with httpx.AsyncClient() as client:
+        response = await client.post(f"{api.base_url}/messages", headers=api.headers, json=payload, timeout=30.0)
+        return response.json()
+
+
+async def run(label: str, api: WhatsAppBusinessAPI, server: StandInGraphApi, bursts: int, pooled: bool):
+    server.connections = server.requests = 0
+    latencies = []
+    for _ in range(bursts):
+        for i in range(4):
+            payload = {"messaging_product": "whatsapp", "to": api.to_number, "text": {"body": f"step {i}"}}
+            started = time.perf_counter()
+            if pooled:
+                await api._make_request("/messages", payload)
+            else:
+                await send_unpooled(api, payload)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    mean = sum(latencies) / len(latencies)
+    print(f"{label:>9}: mean {mean:7.2f} ms  p50 {latencies[len(latencies) // 2]:7.2f} ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95)]:7.2f} ms  "
+          f"{server.connections} connections for {server.requests} requests")
+    return mean
+
+
+async def main(bursts: int, handshake_ms: float):
+    server = StandInGraphApi(handshake_ms)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+
+    message = Message(message_id="bench", phone_number="5214420000000", type="text", content="",
+                      timestamp=datetime.now(), business_phone_number_id="551871334675111")
+    api = WhatsAppBusinessAPI(message)
+    api.base_url = f"http://127.0.0.1:{port}/551871334675111"
+
+    before = await run("unpooled", api, server, bursts, pooled=False)
+    after = await run("pooled", api, server, bursts, pooled=True)
+    print(f"speedup: {before / after:.1f}x per message")
+
+    await whatsapp_http.aclose()
+    listener.close()
+    await listener.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bursts", type=int, default=50)
+    parser.add_argument("--handshake-ms", type=float, default=80.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.bursts, args.handshake_ms))
@@ -0,0 +1,97 @@
+"""Concurrent state updates against the same phone and against different phones.
+
+Every task does a read-modify-write increment with an await in the middle,
+the shape of a real turn. Three modes are exercised:
+
+  unlocked   plain update_state, expected to lose increments on a hot phone
+  cas        update_state(expected_version=...) retried on StateConflictError
+  locked     read-modify-write inside lock(phone)
+
+    python -m benchmarks.stress_state_updates [--backend json|sqlite]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from app.utils.base_state_manager import StateConflictError
+from app.utils.state_manager import StateManager
+from app.utils.state_store import JsonStateStore, SqliteStateStore
+
+TASKS = 200
+INCREMENTS = 25
+
+
+def make_manager(backend: str, tmp: str) -> StateManager:
+    if backend == "sqlite":
+        store = SqliteStateStore(os.path.join(tmp, "states.db"), "clinic_states")
+    else:
+        store = JsonStateStore(os.path.join(tmp, "user_states.json"), flush_interval=0.05)
+    manager = object.__new__(StateManager)
+    manager._initialize(store=store)
+    return manager
+
+
+async def unlocked(manager: StateManager, phone: str):
+    count = manager.get_state(phone).get("count", 0)
+    await asyncio.sleep(random.random() / 1000)
+    manager.update_state(phone, {"count": count + 1})
+
+
+async def cas(manager: StateManager, phone: str) -> int:
+    retries = 0
+    while True:
+        version = manager.get_version(phone)
+        count = manager.get_state(phone).get("count", 0)
+        await asyncio.sleep(random.random() / 1000)
+        try:
+            manager.update_state(phone, {"count": count + 1}, expected_version=version)
+            return retries
+        except StateConflictError:
+            retries += 1
+
+
+async def locked(manager: StateManager, phone: str):
+    async with manager.lock(phone):
+        await unlocked(manager, phone)
+
+
+async def run(manager: StateManager, mode: str, phones: int):
+    worker = {"unlocked": unlocked, "cas": cas, "locked": locked}[mode]
+    targets = [f"phone-{mode}-{phones}-{i % phones}" for i in range(TASKS)]
+
+    async def task(phone: str):
+        retries = 0
+        for _ in range(INCREMENTS):
+            retries += await worker(manager, phone) or 0
+        return retries
+
+    started = time.perf_counter()
+    retries = sum(await asyncio.gather(*(task(phone) for phone in targets)))
+    elapsed = time.perf_counter() - started
+
+    expected = TASKS * INCREMENTS
+    actual = sum(manager.get_state(f"phone-{mode}-{phones}-{i}").get("count", 0) for i in range(phones))
+    status = "ok" if actual == expected else "LOST UPDATES"
+    print(f"{mode:>8} {phones:>4} phone(s): {actual:>6}/{expected} increments  "
+          f"{retries:>6} cas retries  {expected / elapsed:9.0f} updates/s  {status}")
+    return actual == expected
+
+
+async def main(backend: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = make_manager(backend, tmp)
+        results = []
+        for phones in (1, TASKS):
+            for mode in ("unlocked", "cas", "locked"):
+                results.append((mode, await run(manager, mode, phones)))
+        manager.flush()
+
+    assert all(ok for mode, ok in results if mode != "unlocked"), "cas/locked modes must never lose updates"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    asyncio.run(main(parser.parse_args().backend))
@@ -1,16 +1,39 @@
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.endpoints import whatsapp
+from app.engine import dispatcher
+from app.services.http_client import close_http_clients
+from app.services.openai import close_openai_client
+from app.utils.cache import close_caches
+from app.utils.dedup import seen_messages
+from app.utils.doctor_state_manager import DoctorStateManager
+from app.utils.history_store import history_store
+from app.utils.state_manager import StateManager
 from fastapi.exceptions import RequestValidationError
 from app.middleware.exceptions import global_exception_handler
 
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await dispatcher.start()
+    yield
+    await dispatcher.stop()
+    seen_messages.close()
+    StateManager().flush()
+    DoctorStateManager().flush()
+    history_store.close()
+    await close_http_clients()
+    await close_caches()
+    await close_openai_client()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="API for handling WhatsApp messages for anesthesia appointments",
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -0,0 +1,118 @@
+"""Replay logged intent turns against candidate models to inform LLM_ROUTES.
+
+    python -m scripts.eval_model_routing [--samples FILE (default INTENT_LOG_PATH)] [--kind clinic|doctor|all]
+        [--models gpt-4o-mini,gpt-3.5-turbo] [--limit 200] [--concurrency 4]
+
+Takes up to --limit (message, intent) pairs per kind from the intent log
+(the labels are the production LLM's answers, or hand-corrected ones),
+sends each through the production prompt of its call site (classify_intent
+or doctor_intent) with every candidate model, using the call site's routed
+temperature and max_tokens, and reports per model the share of exact label
+matches, failed calls, p50/p95 latency and the cost per 1000 calls from
+PRICES. Hedging and the fallback model are turned off so each number
+belongs to the model under test. Only the intent call sites are covered:
+they are the ones with logged turns.
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List, Tuple
+from app.core.config import settings
+from app.services.doctor_assitant import doctor_intent_prompt
+from app.services.langgraph import classify_intent_prompt
+from app.services.openai import chat_completion
+from app.utils.helpers import response_prompt
+from app.utils.intent_model import CLINIC_INTENTS, DOCTOR_INTENTS, load_samples
+
+# USD per 1M (prompt, completion) tokens; check the provider's current pricing before deciding
+PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4": (30.00, 60.00),
+}
+KINDS = {
+    "clinic": ("classify_intent", classify_intent_prompt, CLINIC_INTENTS),
+    "doctor": ("doctor_intent", doctor_intent_prompt, DOCTOR_INTENTS),
+}
+ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+async def replay(call_site: str, prompt: str, model: str) -> Tuple[str, float, int, int]:
+    # same persona and prompt as invoke_ai, without the conversation history
+    messages = [{"role": ROLES[m.type], "content": m.content}
+                for m in response_prompt.format_messages(input=prompt, chat_history=[])]
+    started = time.perf_counter()
+    response = await chat_completion(messages, model=model, call_site=call_site)
+    latency = (time.perf_counter() - started) * 1000
+    usage = response.usage
+    return ((response.choices[0].message.content or "").strip(), latency,
+            usage.prompt_tokens if usage else 0, usage.completion_tokens if usage else 0)
+
+
+async def evaluate_model(kind: str, model: str, pairs: List[Tuple[str, str]], concurrency: int):
+    call_site, build_prompt, _ = KINDS[kind]
+    semaphore = asyncio.Semaphore(concurrency)
+    correct, failed, latencies, cost = 0, 0, [], 0.0
+    prompt_price, completion_price = PRICES.get(model, (0.0, 0.0))
+
+    async def one(text: str, target: str):
+        nonlocal correct, failed, cost
+        async with semaphore:
+            try:
+                answer, latency, prompt_tokens, completion_tokens = await replay(call_site, build_prompt(text), model)
+            except Exception as e:
+                failed += 1
+                print(f"  {model}: call failed: {e}")
+                return
+        correct += answer == target
+        latencies.append(latency)
+        cost += (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+    await asyncio.gather(*(one(text, target) for text, target in pairs))
+    answered = len(pairs) - failed
+    price = f"${cost / answered * 1000:7.4f}/1k" if answered and model in PRICES else "   no price"
+    print(f"{kind:>6} {model:>16}: accuracy {correct / len(pairs):.3f}  failed {failed:>3}  "
+          f"p50 {percentile(latencies, 50):7.0f} ms  p95 {percentile(latencies, 95):7.0f} ms  {price}")
+
+
+async def main(args):
+    settings.LLM_HEDGE_CALL_SITES = []
+    settings.LLM_FALLBACK_MODEL = None
+    models = args.models.split(",") if args.models else sorted(set(settings.LLM_MODEL_TIERS.values()))
+
+    for kind in (("clinic", "doctor") if args.kind == "all" else (args.kind,)):
+        call_site, _, labels = KINDS[kind]
+        texts, targets = load_samples(args.samples, kind, labels)
+        pairs = list(zip(texts, targets))
+        random.Random(args.seed).shuffle(pairs)
+        pairs = pairs[:args.limit]
+        if not pairs:
+            print(f"{kind}: no samples in {args.samples}; skipped")
+            continue
+
+        print(f"{kind}: {len(pairs)} turns via {call_site} (currently routed to {settings.LLM_ROUTES.get(call_site, settings.LLM_DEFAULT_ROUTE)})")
+        for model in models:
+            await evaluate_model(kind, model, pairs, args.concurrency)
+
+    from app.services.openai import close_openai_client
+    await close_openai_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=settings.INTENT_LOG_PATH, required=not settings.INTENT_LOG_PATH)
+    parser.add_argument("--kind", choices=("clinic", "doctor", "all"), default="all")
+    parser.add_argument("--models", default="", help="comma-separated; defaults to every model in LLM_MODEL_TIERS")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
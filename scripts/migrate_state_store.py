@@ -0,0 +1,30 @@
+"""One-shot copy of the JSON conversation state files into SQLite.
+
+    python -m scripts.migrate_state_store [--db states.db]
+
+Run it with the app stopped, then set STATE_BACKEND=sqlite. The JSON files
+are left untouched so switching back stays possible.
+"""
+import argparse
+import os
+from app.core.config import settings
+from app.utils.doctor_state_manager import DoctorStateManager
+from app.utils.state_manager import StateManager
+from app.utils.state_store import migrate_json_to_sqlite
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=settings.STATE_DB_PATH, help="target SQLite database")
+    args = parser.parse_args()
+
+    for manager in (StateManager, DoctorStateManager):
+        if not os.path.exists(manager.storage_file):
+            print(f"{manager.storage_file}: not found, skipped")
+            continue
+        count = migrate_json_to_sqlite(manager.storage_file, args.db, manager.table)
+        print(f"{manager.storage_file}: {count} conversations -> {args.db}:{manager.table}")
+
+
+if __name__ == "__main__":
+    main()
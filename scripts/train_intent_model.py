@@ -0,0 +1,62 @@
+"""Train the local intent classifiers from logged (message, LLM intent) pairs.
+
+    python -m scripts.train_intent_model [--samples FILE (default INTENT_LOG_PATH)] [--kind clinic|doctor|all]
+
+Holds out --test-fraction of the samples, reports accuracy, the share of
+messages that would still escalate to the LLM at the configured confidence
+threshold and prediction latency, then writes INTENT_MODEL_DIR/<kind>.npz.
+Restart the app to pick up a new model.
+"""
+import argparse
+import os
+import random
+from app.core.config import settings
+from app.utils.intent_model import CLINIC_INTENTS, DOCTOR_INTENTS, evaluate, load_samples, train
+
+LABELS = {"clinic": CLINIC_INTENTS, "doctor": DOCTOR_INTENTS}
+
+
+def train_kind(kind: str, args) -> None:
+    texts, targets = load_samples(args.samples, kind, LABELS[kind])
+    if len(texts) < args.min_samples:
+        print(f"{kind}: {len(texts)} samples, need at least {args.min_samples}; skipped")
+        return
+
+    pairs = list(zip(texts, targets))
+    random.Random(args.seed).shuffle(pairs)
+    split = max(1, int(len(pairs) * args.test_fraction))
+    test, training = pairs[:split], pairs[split:]
+
+    model = train([t for t, _ in training], [y for _, y in training], LABELS[kind],
+                  dim=args.dim, epochs=args.epochs, seed=args.seed)
+    report = evaluate(model, [t for t, _ in test], [y for _, y in test], args.threshold)
+    print(f"{kind}: {len(training)} train / {len(test)} test  accuracy {report['accuracy']:.3f}  "
+          f"escalation {report['escalation_rate']:.1%}  accuracy when local {report['local_accuracy']:.3f}  "
+          f"p50 {report['p50_ms']:.3f} ms  p99 {report['p99_ms']:.3f} ms")
+
+    # refit on everything for the shipped model
+    model = train(texts, targets, LABELS[kind], dim=args.dim, epochs=args.epochs, seed=args.seed)
+    os.makedirs(settings.INTENT_MODEL_DIR, exist_ok=True)
+    path = os.path.join(settings.INTENT_MODEL_DIR, f"{kind}.npz")
+    model.save(path)
+    print(f"{kind}: model written to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=settings.INTENT_LOG_PATH, required=not settings.INTENT_LOG_PATH)
+    parser.add_argument("--kind", choices=("clinic", "doctor", "all"), default="all")
+    parser.add_argument("--dim", type=int, default=2 ** 14, help="hashed feature buckets")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--threshold", type=float, default=settings.INTENT_CONFIDENCE_THRESHOLD)
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--min-samples", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for kind in (("clinic", "doctor") if args.kind == "all" else (args.kind,)):
+        train_kind(kind, args)
+
+
+if __name__ == "__main__":
+    main()